@@ -20,9 +20,8 @@
 from SeaGoatVision.commons import log
 from SeaGoatVision.commons.param import Param
 from SeaGoatVision.commons import keys
+from SeaGoatVision.commons import transport
 import jsonrpclib
-import numpy as np
-import cv2
 logger = log.get_logger(__name__)
 
 
@@ -32,8 +31,8 @@ class JsonClient():
         self.rpc = jsonrpclib.Server('http://%s:%s' % (host, port))
         self._lst_port = []
         self._hostname = host
-        # link observer viewer with deserialize observer
-        self.dct_link_obs_des_obs = {}
+        # {observer : (encoding, quality, size, max_fps)}
+        self.dct_observer_preview = {}
 
     def __getattr__(self, name):
         return getattr(self.rpc, name)
@@ -45,39 +44,54 @@ class JsonClient():
     def set_subscriber(self, subscriber):
         self.subscriber = subscriber
 
-    def add_image_observer(self, observer, execution_name, filter_name):
+    def add_image_observer(self, observer, execution_name, filter_name,
+                           encoding=None, quality=None, size=None,
+                           max_fps=None):
         """
             Inform the server what filter we want to observe
             Param :
                 - ref, observer is a reference on method for callback
                 - string, execution_name to select an execution
                 - string, filter_name to select the filter
+                - string, encoding of the image : raw, jpeg or png
+                - int, quality of the jpeg encoding
+                - float or [width, height], size to reduce the image
+                - float, max_fps to skip the images
         """
-        status = self.rpc.add_image_observer(execution_name, filter_name)
+        encoding_quality = transport.get_encoding(encoding, quality)
+        if not encoding_quality:
+            return False
+        preview = encoding_quality + (size, max_fps)
+        status = self.rpc.add_image_observer(execution_name, filter_name,
+                                             *preview)
         if status:
-            key = keys.create_unique_exec_filter_name(execution_name, filter_name)
-            des_observer = self._deserialize_image(observer)
-            self.dct_link_obs_des_obs[observer] = des_observer
-            status = self.subscriber.subscribe(key, des_observer)
+            key = keys.create_unique_exec_filter_image_name(
+                execution_name, filter_name, *preview)
+            self.dct_observer_preview[observer] = preview
+            status = self.subscriber.subscribe(key, observer)
         return status
 
     def set_image_observer(
             self, observer, execution_name, filter_name_old, filter_name_new):
-        status = self.rpc.set_image_observer(execution_name, filter_name_old, filter_name_new)
+        preview = self.dct_observer_preview[observer]
+        status = self.rpc.set_image_observer(execution_name, filter_name_old,
+                                             filter_name_new, *preview)
         if status:
-            new_key = keys.create_unique_exec_filter_name(execution_name, filter_name_new)
-            old_key = keys.create_unique_exec_filter_name(execution_name, filter_name_old)
-            des_observer = self.dct_link_obs_des_obs[observer]
-            self.subscriber.desubscribe(old_key, des_observer)
-            status = self.subscriber.subscribe(new_key, des_observer)
+            new_key = keys.create_unique_exec_filter_image_name(
+                execution_name, filter_name_new, *preview)
+            old_key = keys.create_unique_exec_filter_image_name(
+                execution_name, filter_name_old, *preview)
+            self.subscriber.desubscribe(old_key, observer)
+            status = self.subscriber.subscribe(new_key, observer)
         return status
 
     def remove_image_observer(self, observer, execution_name, filter_name):
-        status = self.rpc.remove_image_observer(execution_name, filter_name)
-        key = keys.create_unique_exec_filter_name(execution_name, filter_name)
-        des_observer = self.dct_link_obs_des_obs[observer]
-        self.subscriber.desubscribe(key, des_observer)
-        del self.dct_link_obs_des_obs[observer]
+        preview = self.dct_observer_preview.pop(observer)
+        status = self.rpc.remove_image_observer(execution_name, filter_name,
+                                                *preview)
+        key = keys.create_unique_exec_filter_image_name(
+            execution_name, filter_name, *preview)
+        self.subscriber.desubscribe(key, observer)
         return status
 
     def get_params_filterchain(self, execution_name, filter_name):
@@ -91,10 +105,3 @@ class JsonClient():
 
     def _deserialize_param(self, lst_param_ser):
         return [Param("temp", None, serialize=param_ser) for param_ser in lst_param_ser]
-
-    def _deserialize_image(self, cb):
-        def deserialize_image(data):
-            img = np.loads(data)
-            img_cv = cv2.imdecode(img, 1)
-            cb(img_cv)
-        return deserialize_image
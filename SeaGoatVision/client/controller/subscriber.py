@@ -23,6 +23,7 @@ Description : ZeroMQ publisher implementation
 
 import zmq
 import threading
+from SeaGoatVision.commons import transport
 from SeaGoatVision.commons import log
 
 CST_TOPIC_KEY = "topic"
@@ -71,6 +72,7 @@ class Subscriber():
         # if list is empty, remove the key
         if not lst_cb:
             del self.dct_key_topic_cb[key]
+            self.server.remove_subscriber(lst_topic[0])
         return True
 
     def _add_callback(self, key, callback):
@@ -110,14 +112,21 @@ class ListenOutput(threading.Thread):
         self.port = port
 
     def run(self):
+        # only the subscribed topics are received, the publisher skips the
+        # topics without subscriber
         self.socket.connect("tcp://%s:%s" % (self.addr, self.port))
-        # TODO bug, it's not normal to subscribe for all topic
-        self.socket.setsockopt(zmq.SUBSCRIBE,'')
         while not self.is_stopped:
             try:
-                data = self.socket.recv_pyobj()
-                if data:
-                    self.observer(data)
+                lst_frame = self.socket.recv_multipart(copy=False)
+                if len(lst_frame) != 3:
+                    logger.warning("Receive a message of %d frames." %
+                                   len(lst_frame))
+                    continue
+                topic = transport.decode_topic(lst_frame[0].bytes)
+                # the image is decoded without copy of the payload
+                data = transport.decode(lst_frame[1].bytes,
+                                        lst_frame[2].buffer)
+                self.observer((topic, data))
             except zmq.error.ZMQError:
                 # ignore it, it's the timeout
                 # TODO can we do something with ZMQError?
@@ -128,10 +137,10 @@ class ListenOutput(threading.Thread):
         self.socket.close()
 
     def add_subscriber(self, no):
-        self.socket.setsockopt(zmq.SUBSCRIBE, str(no))
+        self.socket.setsockopt(zmq.SUBSCRIBE, transport.encode_topic(no))
 
     def remove_subscriber(self, no):
-        self.socket.setsockopt(zmq.UNSUBSCRIBE, str(no))
+        self.socket.setsockopt(zmq.UNSUBSCRIBE, transport.encode_topic(no))
 
     def stop(self):
         self.is_stopped = True
@@ -76,7 +76,8 @@ class WinViewer(QtGui.QDockWidget):
 
         self.light_observer = self._get_light_observer()
 
-        if self.controller.add_image_observer(self.update_image, execution_name, self.actual_filter):
+        if self.controller.add_image_observer(self.update_image, execution_name, self.actual_filter,
+                                              size=self._get_preview_size()):
             self.__add_output_observer()
             self.subscriber.subscribe(self.media_name, self.update_fps)
             self.subscriber.subscribe(
@@ -170,7 +171,11 @@ class WinViewer(QtGui.QDockWidget):
         logger.info("Qt output exec %s - %s" % (self.execution_name, data))
 
     def update_fps(self, data):
-        self.ui.lbl_fps.setText("%s" % data)
+        nb_drop = data.get("drop", {}).get(self.execution_name, 0)
+        if nb_drop:
+            self.ui.lbl_fps.setText("%s (drop %s)" % (data.get("fps"), nb_drop))
+        else:
+            self.ui.lbl_fps.setText("%s" % data.get("fps"))
 
     def update_image(self, image):
         self.light_observer.active_light()
@@ -204,14 +209,31 @@ class WinViewer(QtGui.QDockWidget):
         data = buff.getvalue()
         buff.close()
         qimage = QtGui.QImage.fromData(data)
-        if self.size != 1.0:
-            shape = image.shape
-            qimage = qimage.scaled(shape[1] * self.size, shape[0] * self.size)
         self.newImage.emit(qimage)
 
     def set_image_scale(self, text_size):
         text_size = text_size[:-1]
-        self.size = float(text_size) / 100
+        size = float(text_size) / 100
+        if size == self.size:
+            return
+        self.size = size
+        if not self.actual_filter or self.execution_stopped:
+            return
+        # the server reduce the image before sending it
+        self.controller.remove_image_observer(
+            self.update_image,
+            self.execution_name,
+            self.actual_filter)
+        self.controller.add_image_observer(
+            self.update_image,
+            self.execution_name,
+            self.actual_filter,
+            size=self._get_preview_size())
+
+    def _get_preview_size(self):
+        if self.size == 1:
+            return None
+        return self.size
 
     def update_execution(self, data):
         # check if the execution name is removed
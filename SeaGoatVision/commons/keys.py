@@ -67,11 +67,82 @@ def get_key_format_avi():
 def get_key_format_png():
     return "png"
 
+# encoding of the images sent to the subscribers
+
+
+def get_key_encoding_raw():
+    return "raw"
+
+
+def get_key_encoding_jpeg():
+    return "jpeg"
+
+
+def get_key_encoding_png():
+    return "png"
+
+# policy of delivery when an observer of media is late
+
+
+def get_key_policy_block():
+    return "block"
+
+
+def get_key_policy_drop_oldest():
+    return "drop_oldest"
+
+
+def get_key_policy_keep_latest():
+    return "keep_latest"
+
+# state of a media, probed in background on start
+
+
+def get_key_media_state_probing():
+    return "probing"
+
+
+def get_key_media_state_available():
+    return "available"
+
+
+def get_key_media_state_unavailable():
+    return "unavailable"
+
 # generator
 
 def create_unique_exec_filter_name(execution_name, filter_name):
     return "%s_%s" % (execution_name, filter_name)
 
+
+def create_unique_exec_filter_image_name(execution_name, filter_name,
+                                         encoding, quality=None, size=None,
+                                         max_fps=None):
+    key = "%s_%s" % (create_unique_exec_filter_name(execution_name,
+                                                    filter_name), encoding)
+    if quality is not None:
+        key += str(quality)
+    if size:
+        if isinstance(size, (list, tuple)):
+            key += "_%dx%d" % tuple(size)
+        else:
+            key += "_%s" % size
+    if max_fps:
+        key += "_%sfps" % max_fps
+    return key
+
+
+def create_unique_exec_profile_name(execution_name):
+    return "profile_%s" % execution_name
+
+
+def create_unique_exec_latency_name(execution_name):
+    return "latency_%s" % execution_name
+
+
+def create_unique_exec_output_name(execution_name):
+    return "output_%s" % execution_name
+
 # used by ZeroMQ
 
 
@@ -87,6 +158,10 @@ def get_key_media_param():
     return "media_param"
 
 
+def get_key_media_state():
+    return "media_state"
+
+
 def get_key_all_output_filter():
     return "all_output_filter"
 
@@ -97,4 +172,5 @@ def get_lst_key_topic_pubsub():
         get_key_execution_list(): 2,
         get_key_filter_param(): 3,
         get_key_media_param(): 4,
+        get_key_media_state(): 5,
     }
@@ -19,6 +19,7 @@
 
 import inspect
 import logging
+import threading
 import time
 import os
 
@@ -152,5 +153,16 @@ def print_function(logger_call, message, last_stack=False):
     logger_call(to_print)
 
 
+def reinit_after_fork():
+    # the logging locks held by another thread during a fork stay locked in
+    # the child process, create new ones
+    logging._lock = threading.RLock()
+    for ref in logging._handlerList:
+        handler = ref()
+        if handler is not None:
+            handler.createLock()
+
+
 # create own_logger to log info from himself!!
 own_logger = get_logger(__name__)
+
@@ -36,6 +36,7 @@ TIPS :
   The value is always the low value and the threshold_hight is the hight value.
     p = Param("f", 2, min_v=1, max_v=8, thres_h=5)
 """
+import threading
 import numpy as np
 from SeaGoatVision.commons import log
 
@@ -67,6 +68,13 @@ class Param(object):
         self.thres_h = None
         self.force_type = None
         self.last_serialize_value = None
+        # result of get, replaced in one assignment when the value change
+        self.value_cache = None
+        # incremented after each change of value_cache, to cache the results
+        # computed from the value
+        self.version = 0
+        # value pinned by each thread executing a frame, see pin
+        self.frame = threading.local()
 
         if serialize:
             status = self.deserialize(serialize)
@@ -84,6 +92,8 @@ class Param(object):
         self._init_param(value, min_v, max_v, lst_value, force_type, thres_h)
 
     def _init_param(self, value, min_v, max_v, lst_value, force_type, thres_h):
+        # the cache is updated when the new type is known
+        self.force_type = None
         self._valid_param(value, min_v, max_v, lst_value, thres_h)
         self.set(value)
         self.default_value = self.last_serialize_value = self.value
@@ -91,6 +101,7 @@ class Param(object):
             self.force_type = force_type
         else:
             self.force_type = self.type_t
+        self._update_cache()
 
     def _valid_param(self, value, min_v, max_v, lst_value, thres_h):
         type_t = type(value)
@@ -170,6 +181,7 @@ class Param(object):
         if self.value == self.last_serialize_value:
             return
         self.value = self.last_serialize_value
+        self._update_cache()
         for notify in self.lst_notify_reset:
             notify(self.get_name(), self.value)
 
@@ -177,6 +189,7 @@ class Param(object):
         if self.value == self.default_value:
             return
         self.value = self.default_value
+        self._update_cache()
         for notify in self.lst_notify_reset:
             notify(self.get_name(), self.value)
 
@@ -187,6 +200,7 @@ class Param(object):
         self.max_v = param.max_v
         self.lst_value = param.lst_value
         self.thres_h = param.thres_h
+        self._update_cache()
 
     def get_name(self):
         return self.name
@@ -235,13 +249,46 @@ class Param(object):
         self.lst_notify_reset.remove(callback)
 
     def get(self):
+        # the executing thread read the value of the start of the frame
+        frame = self.frame
+        if getattr(frame, "is_pinned", False):
+            return frame.value
+        return self.value_cache
+
+    def get_version(self):
+        # version of the value returned by get
+        frame = self.frame
+        if getattr(frame, "is_pinned", False):
+            return frame.version
+        return self.version
+
+    def pin(self):
+        # keep the actual value for the current thread until unpin, the
+        # modifications from other threads are visible on the next frame.
+        # Each thread has his value, a param can be shared between threads.
+        # The version is read first, an older version only rebuilds a cache.
+        self.frame.version = self.version
+        self.frame.value = self.value_cache
+        self.frame.is_pinned = True
+
+    def unpin(self):
+        self.frame.is_pinned = False
+        self.frame.value = None
+
+    def _update_cache(self):
+        if self.force_type is None:
+            # not initialized
+            return
         # Exception, cannot convert to numpy array
         # this can create bug in your filter if you pass wrong type
         if self.force_type is np.ndarray:
-            return self.value
-        if self.thres_h is not None:
-            return (self.force_type(self.value), self.force_type(self.thres_h))
-        return self.force_type(self.value)
+            value = self.value
+        elif self.thres_h is not None:
+            value = (self.force_type(self.value), self.force_type(self.thres_h))
+        else:
+            value = self.force_type(self.value)
+        self.value_cache = value
+        self.version += 1
 
     def get_pos_list(self):
         if not self.lst_value:
@@ -294,6 +341,7 @@ class Param(object):
                                     % (thres_h, self.max_v))
                 self.thres_h = thres_h
         self.value = value
+        self._update_cache()
         # send the value on all notify callback
         for notify in self.lst_notify:
             notify(value)
@@ -0,0 +1,262 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Typed outputs of the filters and their binary format.
+A packet contains the records of a frame, all numbers are little-endian:
+ - header : "SGVR", version (uint8), seq (int64, -1 without frame),
+   timestamp (float64), scale (float64), size of the media name (uint8),
+   number of records (uint16), then the media name
+ - record : type (uint8), size of the source (uint8), size of the name
+   (uint8), the source, the name, then the value:
+    - text : size (uint32) and the utf-8 text
+    - point : x, y (float64)
+    - line : x1, y1, x2, y2 (float64)
+    - rect : x, y, width, height (float64)
+    - scalar : value (float64)
+    - array : dtype like "<f8" (3 chars), ndim (uint8), shape (uint32 per
+      dimension) and the values in C order
+On a stream, each packet is preceded by his size (uint32).
+The text clients receive a line per record, the coordinates are integers like
+the text outputs sent before the records.
+The typed records are in the coordinates of the media. The text records are
+sent as is by the filters, their coordinates are in the image executed by the
+filterchain, the image of the media resized by the scale of the header.
+"""
+
+import struct
+import numpy as np
+
+MAGIC = "SGVR"
+VERSION = 2
+# the names are cut at this size
+MAX_NAME = 255
+
+TYPE_TEXT = 0
+TYPE_POINT = 1
+TYPE_LINE = 2
+TYPE_RECT = 3
+TYPE_SCALAR = 4
+TYPE_ARRAY = 5
+
+_HEADER = struct.Struct("<4sBqddBH")
+_RECORD_HEADER = struct.Struct("<BBB")
+_SIZE = struct.Struct("<I")
+_ARRAY_HEADER = struct.Struct("<3sB")
+# {type : struct of the value}, the other types have a variable size
+_DCT_STRUCT = {
+    TYPE_POINT: struct.Struct("<2d"),
+    TYPE_LINE: struct.Struct("<4d"),
+    TYPE_RECT: struct.Struct("<4d"),
+    TYPE_SCALAR: struct.Struct("<d"),
+}
+# {type : names of the values in the text}
+_DCT_FIELD = {
+    TYPE_POINT: ("x", "y"),
+    TYPE_LINE: ("x1", "y1", "x2", "y2"),
+    TYPE_RECT: ("x", "y", "width", "height"),
+    TYPE_SCALAR: ("value",),
+}
+
+
+class Record(object):
+
+    """Output of a filter. value is a string for text, a tuple of numbers
+    for point, line, rect and a number for scalar, a numpy array for array.
+    text_format is the line of the text clients, like "%(name)s: x=%(x)d",
+    with the name and the fields of the type. It's not in the packets.
+    """
+    __slots__ = ("source", "name", "type", "value", "text_format")
+
+    def __init__(self, source, name, type, value, text_format=None):
+        self.source = source
+        self.name = name
+        self.type = type
+        self.value = value
+        self.text_format = text_format
+
+    def __reduce__(self):
+        # send to another process
+        return Record, (self.source, self.name, self.type, self.value,
+                        self.text_format)
+
+    def __str__(self):
+        # the line sent to the text clients
+        if self.type == TYPE_TEXT:
+            return self.value
+        if self.type == TYPE_ARRAY:
+            return "%s: shape=%s values=%s" % (
+                self.name, "x".join(str(i) for i in self.value.shape),
+                self.value.tolist())
+        values = (self.value,) if self.type == TYPE_SCALAR else self.value
+        lst_field = _DCT_FIELD[self.type]
+        if self.text_format:
+            dct_value = dict(zip(lst_field, values))
+            dct_value["name"] = self.name
+            return self.text_format % dct_value
+        if self.type == TYPE_SCALAR:
+            return "%s: value=%s" % (self.name, _str_number(self.value))
+        # the coordinates are truncated, like int()
+        return "%s: %s" % (self.name, " ".join(
+            "%s=%d" % (field, value)
+            for field, value in zip(lst_field, values)))
+
+    def __repr__(self):
+        return "Record(%r, %r, %r, %r)" % (self.source, self.name, self.type,
+                                           self.value)
+
+
+def create_text(text, source=""):
+    return Record(source, "", TYPE_TEXT, text)
+
+
+def encode(lst_record, frame=None):
+    # frame is a dict with timestamp, seq and media_name, see FrameInfo, and
+    # the scale of the execution
+    if frame:
+        seq = frame.get("seq", -1)
+        timestamp = frame.get("timestamp", 0.0)
+        scale = frame.get("scale", 1.0)
+        media_name = _get_bytes(frame.get("media_name", ""))[:MAX_NAME]
+    else:
+        seq, timestamp, scale, media_name = -1, 0.0, 1.0, ""
+    lst_data = [_HEADER.pack(MAGIC, VERSION, seq, timestamp, scale,
+                             len(media_name), len(lst_record)),
+                media_name]
+    for item in lst_record:
+        if not isinstance(item, Record):
+            item = create_text(item)
+        _encode_record(item, lst_data)
+    return "".join(lst_data)
+
+
+def decode(packet):
+    # return (frame, [Record]), frame is None when the packet has no frame
+    packet = buffer(packet)
+    magic, version, seq, timestamp, scale, size, nb_record = \
+        _HEADER.unpack_from(packet)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a packet of records version %d." % VERSION)
+    offset = _HEADER.size
+    media_name = str(packet[offset:offset + size])
+    offset += size
+    frame = None
+    if seq >= 0:
+        frame = {"seq": seq, "timestamp": timestamp,
+                 "media_name": media_name, "scale": scale}
+    lst_record = []
+    for _ in range(nb_record):
+        item, offset = _decode_record(packet, offset)
+        lst_record.append(item)
+    return frame, lst_record
+
+
+def encode_stream(packet):
+    return _SIZE.pack(len(packet)) + packet
+
+
+def decode_stream(data):
+    # return ([packet], rest of the data not complete)
+    lst_packet = []
+    offset = 0
+    while len(data) - offset >= _SIZE.size:
+        size = _SIZE.unpack_from(data, offset)[0]
+        if len(data) - offset - _SIZE.size < size:
+            break
+        offset += _SIZE.size
+        lst_packet.append(data[offset:offset + size])
+        offset += size
+    return lst_packet, data[offset:]
+
+
+def _encode_record(item, lst_data):
+    source = _get_bytes(item.source)[:MAX_NAME]
+    name = _get_bytes(item.name)[:MAX_NAME]
+    lst_data.append(_RECORD_HEADER.pack(item.type, len(source), len(name)))
+    lst_data.append(source)
+    lst_data.append(name)
+    if item.type == TYPE_TEXT:
+        text = _get_bytes(item.value)
+        lst_data.append(_SIZE.pack(len(text)))
+        lst_data.append(text)
+    elif item.type == TYPE_ARRAY:
+        array = _get_array(item.value)
+        lst_data.append(_ARRAY_HEADER.pack(array.dtype.str, array.ndim))
+        lst_data.append(struct.pack("<%dI" % array.ndim, *array.shape))
+        lst_data.append(array.tostring())
+    elif item.type == TYPE_SCALAR:
+        lst_data.append(_DCT_STRUCT[item.type].pack(item.value))
+    else:
+        lst_data.append(_DCT_STRUCT[item.type].pack(*item.value))
+
+
+def _decode_record(packet, offset):
+    type_record, size_source, size_name = \
+        _RECORD_HEADER.unpack_from(packet, offset)
+    offset += _RECORD_HEADER.size
+    source = str(packet[offset:offset + size_source])
+    offset += size_source
+    name = str(packet[offset:offset + size_name])
+    offset += size_name
+    if type_record == TYPE_TEXT:
+        size = _SIZE.unpack_from(packet, offset)[0]
+        offset += _SIZE.size
+        value = str(packet[offset:offset + size]).decode("utf-8")
+        offset += size
+    elif type_record == TYPE_ARRAY:
+        dtype, ndim = _ARRAY_HEADER.unpack_from(packet, offset)
+        offset += _ARRAY_HEADER.size
+        shape = struct.unpack_from("<%dI" % ndim, packet, offset)
+        offset += 4 * ndim
+        count = int(np.prod(shape))
+        value = np.frombuffer(packet, dtype=dtype, count=count,
+                              offset=offset).reshape(shape)
+        offset += value.nbytes
+    elif type_record in _DCT_STRUCT:
+        value_struct = _DCT_STRUCT[type_record]
+        value = value_struct.unpack_from(packet, offset)
+        if type_record == TYPE_SCALAR:
+            value = value[0]
+        offset += value_struct.size
+    else:
+        raise ValueError("Unknown type of record %s." % type_record)
+    return Record(source, name, type_record, value), offset
+
+
+def _get_array(value):
+    # little-endian numbers of at most 8 bytes, so the dtype is 3 chars
+    array = np.asarray(value)
+    if array.dtype.kind not in "biuf" or array.dtype.itemsize > 8:
+        array = array.astype(np.float64)
+    return np.ascontiguousarray(array,
+                                dtype=array.dtype.newbyteorder("<"))
+
+
+def _get_bytes(text):
+    if text is None:
+        return ""
+    if isinstance(text, unicode):
+        return text.encode("utf-8")
+    return str(text)
+
+
+def _str_number(value):
+    if float(value).is_integer():
+        return "%d" % value
+    return "%.3f" % value
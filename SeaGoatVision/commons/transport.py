@@ -0,0 +1,135 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Format of the messages between the publisher and the
+subscriber. A message is 3 ZeroMQ frames: the topic, a header in json and
+the payload. The payload is json data, an image, raw or compressed, or a
+packet of records. The topic ends with a null byte, so the prefix matching
+of the subscriptions cannot match another topic, like "1" and "12".
+"""
+
+import json
+import time
+import numpy as np
+import cv2
+from cv2 import cv
+from SeaGoatVision.commons import keys
+from SeaGoatVision.commons import record
+from SeaGoatVision.commons import log
+
+logger = log.get_logger(__name__)
+
+TYPE_JSON = "json"
+TYPE_IMAGE = "image"
+TYPE_RECORD = "record"
+DEFAULT_JPEG_QUALITY = 95
+
+
+def get_lst_encoding():
+    return [keys.get_key_encoding_raw(),
+            keys.get_key_encoding_jpeg(),
+            keys.get_key_encoding_png()]
+
+
+def get_encoding(encoding=None, quality=None):
+    # return (encoding, quality) with the default values, None if not valid
+    if encoding is None:
+        encoding = keys.get_key_encoding_jpeg()
+    if encoding not in get_lst_encoding():
+        log.print_function(
+            logger.error, "Encoding %s not supported, use one of %s." %
+            (encoding, get_lst_encoding()))
+        return None
+    if encoding != keys.get_key_encoding_jpeg():
+        return encoding, None
+    if quality is None:
+        quality = DEFAULT_JPEG_QUALITY
+    return encoding, int(quality)
+
+
+def encode_topic(topic):
+    # also the prefix to subscribe to the topic
+    return "%d\0" % topic
+
+
+def decode_topic(data):
+    return int(data.rstrip("\0"))
+
+
+def encode_json(data):
+    return {"type": TYPE_JSON}, json.dumps(data, default=_to_json)
+
+
+def _to_json(obj):
+    # the numpy scalars and arrays, json raises TypeError for the others
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError("%s is not JSON serializable" % repr(obj))
+
+
+def encode_image(image, encoding, quality, seq, frame=None):
+    # the payload is sent without copy, don't modify the image after
+    # frame is the serialized capture of the image, see FrameInfo
+    header = {"type": TYPE_IMAGE,
+              "shape": image.shape,
+              "dtype": image.dtype.str,
+              "encoding": encoding,
+              "seq": seq,
+              "timestamp": time.time()}
+    if frame:
+        header["frame"] = frame
+    if encoding == keys.get_key_encoding_jpeg():
+        payload = cv2.imencode(
+            ".jpeg", image, (cv.CV_IMWRITE_JPEG_QUALITY, quality))[1]
+    elif encoding == keys.get_key_encoding_png():
+        payload = cv2.imencode(".png", image)[1]
+    else:
+        payload = np.ascontiguousarray(image)
+    return header, payload
+
+
+def encode_record(lst_record, frame=None):
+    return {"type": TYPE_RECORD}, record.encode(lst_record, frame)
+
+
+def serialize_header(header):
+    return json.dumps(header)
+
+
+def decode(header, payload):
+    header = json.loads(header)
+    if header.get("type") == TYPE_RECORD:
+        # (frame, [Record])
+        return record.decode(_get_bytes(payload))
+    if header.get("type") != TYPE_IMAGE:
+        return json.loads(_get_bytes(payload))
+    if header.get("encoding") == keys.get_key_encoding_raw():
+        image = np.frombuffer(payload, dtype=header["dtype"])
+        return image.reshape(header["shape"])
+    return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), 1)
+
+
+def _get_bytes(payload):
+    # the payload is a buffer or a memoryview when received without copy
+    if isinstance(payload, memoryview):
+        return payload.tobytes()
+    return str(payload)
@@ -0,0 +1,175 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Execute a filterchain on fixed frames, without rpc server and
+camera, and save the throughput and the latency of each filter.
+"""
+
+import os
+import json
+import resource
+import subprocess
+import time
+import cv2
+from SeaGoatVision.server.core.resource import Resource
+from SeaGoatVision.server.media.implementation.imageGenerator import ImageGenerator
+from SeaGoatVision.server.media.implementation.imagefolder import ImageFolder
+from SeaGoatVision.server.media.implementation.movie import Movie
+from SeaGoatVision.commons import log
+
+logger = log.get_logger(__name__)
+
+# the frames are loaded before the execution, limit the memory
+MAX_SOURCE_FRAME = 30
+
+
+class ConfBenchmark:
+
+    def __init__(self):
+        self.media = ImageGenerator
+        self.name = "benchmark"
+
+
+def run(filterchain_name, lst_resolution, folder=None, movie=None,
+        nb_frame=300, nb_warmup=10, output=None):
+    o_resource = Resource()
+    filterchain = o_resource.get_filterchain(filterchain_name,
+                                             force_new_filterchain=True)
+    if not filterchain:
+        log.print_function(
+            logger.error, "Filterchain %s not exist or contain error." %
+            filterchain_name)
+        return None
+
+    if folder:
+        source = folder
+    elif movie:
+        source = movie
+    else:
+        source = "generator"
+
+    lst_result = []
+    for width, height in lst_resolution:
+        lst_frame = _load_frames(width, height, folder=folder, movie=movie)
+        if not lst_frame:
+            log.print_function(
+                logger.error, "No frame to execute from %s." % source)
+            return None
+        result = _execute(filterchain, lst_frame, nb_frame, nb_warmup)
+        result["resolution"] = [width, height]
+        _print_result(result)
+        lst_result.append(result)
+    filterchain.destroy()
+
+    data = {"filterchain": filterchain_name,
+            "source": source,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "commit": _get_commit(),
+            "results": lst_result}
+    if output:
+        with open(output, "w") as f:
+            json.dump(data, f, indent=4)
+        logger.info("Benchmark saved in %s." % output)
+    return data
+
+
+def _execute(filterchain, lst_frame, nb_frame, nb_warmup):
+    nb_source = len(lst_frame)
+    for i in range(nb_warmup):
+        filterchain.execute(lst_frame[i % nb_source])
+    filterchain.profiler.clear()
+
+    start_time = time.time()
+    for i in range(nb_frame):
+        filterchain.execute(lst_frame[i % nb_source])
+    duration = time.time() - start_time
+
+    return {"nb_frame": nb_frame,
+            "duration": duration,
+            "fps": nb_frame / duration if duration else 0,
+            "profile": filterchain.get_profile(),
+            # kilobyte on Linux
+            "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def _load_frames(width, height, folder=None, movie=None):
+    lst_image = []
+    if folder:
+        imagefolder = ImageFolder()
+        if os.path.isdir(folder):
+            imagefolder.read_folder(folder)
+        else:
+            imagefolder.read_image(folder)
+        nb_image = min(imagefolder.get_total_frames(), MAX_SOURCE_FRAME)
+        lst_image = [imagefolder.next() for _ in range(nb_image)]
+    elif movie:
+        video = Movie(movie)
+        try:
+            for _ in range(MAX_SOURCE_FRAME):
+                lst_image.append(video.next())
+        except StopIteration:
+            pass
+        video.video.release()
+    else:
+        generator = ImageGenerator(ConfBenchmark())
+        try:
+            generator.update_property_param("width", width)
+            generator.update_property_param("height", height)
+        except Exception as e:
+            log.print_function(
+                logger.error, "Resolution %dx%d of the generator: %s" %
+                (width, height, e))
+            return []
+        lst_image = [generator.next().copy()]
+        generator.buffer_pool.clear()
+
+    lst_frame = []
+    for image in lst_image:
+        if image is None:
+            continue
+        if image.shape[:2] != (height, width):
+            image = cv2.resize(image, (width, height))
+        else:
+            image = image.copy()
+        # same as a media, the frame is shared in read-only
+        image.flags.writeable = False
+        lst_frame.append(image)
+    return lst_frame
+
+
+def _print_result(result):
+    logger.info("Resolution %dx%d: %.1f fps on %d frames, peak rss %s" %
+                (result["resolution"][0], result["resolution"][1],
+                 result["fps"], result["nb_frame"], result["peak_rss"]))
+    for info in result["profile"]["filters"]:
+        wall = info["wall"]
+        logger.info("    %s: p50 %.2f ms, p95 %.2f ms, p99 %.2f ms" %
+                    (info["name"], wall["p50"], wall["p95"], wall["p99"]))
+
+
+def _get_commit():
+    # compare the runs between the commits
+    try:
+        path = os.path.dirname(os.path.abspath(__file__))
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"],
+                                         cwd=path, stderr=subprocess.STDOUT)
+        return commit.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -24,10 +24,10 @@ Description : JsonRPC server implementation
 # Import required RPC modules
 from jsonrpclib.SimpleJSONRPCServer import SimpleJSONRPCServer
 from SeaGoatVision.server.core.cmdHandler import CmdHandler
+from SeaGoatVision.server.media import frame_info
 from SeaGoatVision.commons import log
 from SeaGoatVision.commons import keys
-import cv2
-from cv2 import cv
+from SeaGoatVision.commons import transport
 
 logger = log.get_logger(__name__)
 
@@ -69,11 +69,17 @@ class JsonrpcServer():
             self.cmd_handler.start_filterchain_execution,
             "start_filterchain_execution")
         self.server.register_function(
-            self.cmd_handler.stop_filterchain_execution,
+            self.stop_filterchain_execution,
             "stop_filterchain_execution")
         self.server.register_function(
             self.cmd_handler.get_fps_execution,
             "get_fps_execution")
+        self.server.register_function(
+            self.cmd_handler.get_execution_profile,
+            "get_execution_profile")
+        self.server.register_function(
+            self.cmd_handler.get_execution_latency,
+            "get_execution_latency")
         self.server.register_function(
             self.cmd_handler.add_output_observer,
             "add_output_observer")
@@ -89,6 +95,9 @@ class JsonrpcServer():
         self.server.register_function(
             self.cmd_handler.get_media_list,
             "get_media_list")
+        self.server.register_function(
+            self.cmd_handler.get_media_state,
+            "get_media_state")
         self.server.register_function(
             self.cmd_handler.start_record,
             "start_record")
@@ -171,41 +180,103 @@ class JsonrpcServer():
     #
     # OBSERVATOR ################################
     #
-    def add_image_observer(self, execution_name, filter_name):
-        key = keys.create_unique_exec_filter_name(execution_name, filter_name)
-        observer = self._cb_send_image(key)
-        if self.cmd_handler.add_image_observer(observer, execution_name, filter_name):
-            if key not in self.dct_observer:
-                self.dct_observer[key] = observer
-            return True
-        return False
-
-    def set_image_observer(
-            self, execution_name, filter_name_old, filter_name_new):
-        old_key = keys.create_unique_exec_filter_name(execution_name, filter_name_old)
-        new_key = keys.create_unique_exec_filter_name(execution_name, filter_name_new)
-        observer = self.dct_observer[old_key]
-        new_observer = self._cb_send_image(new_key)
-        if self.cmd_handler.set_image_observer(observer, execution_name, filter_name_old,
-                                                            filter_name_new, new_observer=new_observer):
-            del self.dct_observer[old_key]
-            self.dct_observer[new_key] = new_observer
-            return True
-        return False
+    def add_image_observer(self, execution_name, filter_name, encoding=None,
+                           quality=None, size=None, max_fps=None):
+        """
+            encoding is raw, jpeg or png, quality is used by jpeg
+            size is a scale or a [width, height] to reduce the image before
+            the encoding, max_fps skip the images
+        """
+        encoding_quality = transport.get_encoding(encoding, quality)
+        if not encoding_quality:
+            return False
+        encoding, quality = encoding_quality
+        key = keys.create_unique_exec_filter_image_name(
+            execution_name, filter_name, encoding, quality, size, max_fps)
+        return self._add_subscriber(key, execution_name, filter_name,
+                                    encoding, quality, size, max_fps)
+
+    def set_image_observer(self, execution_name, filter_name_old,
+                           filter_name_new, encoding=None, quality=None,
+                           size=None, max_fps=None):
+        encoding_quality = transport.get_encoding(encoding, quality)
+        if not encoding_quality:
+            return False
+        encoding, quality = encoding_quality
+        old_key = keys.create_unique_exec_filter_image_name(
+            execution_name, filter_name_old, encoding, quality, size, max_fps)
+        new_key = keys.create_unique_exec_filter_image_name(
+            execution_name, filter_name_new, encoding, quality, size, max_fps)
+        if old_key not in self.dct_observer:
+            logger.warning("Missing image observer : %s" % old_key)
+            return False
+        if not self._add_subscriber(new_key, execution_name, filter_name_new,
+                                    encoding, quality, size, max_fps):
+            return False
+        return self._remove_subscriber(old_key, filter_name_old)
 
-    def remove_image_observer(self, execution_name, filter_name):
-        key = keys.create_unique_exec_filter_name(execution_name, filter_name)
-        observer = self.dct_observer.get(key, None)
-        if observer is None:
+    def remove_image_observer(self, execution_name, filter_name, encoding=None,
+                              quality=None, size=None, max_fps=None):
+        encoding_quality = transport.get_encoding(encoding, quality)
+        if not encoding_quality:
+            return False
+        encoding, quality = encoding_quality
+        key = keys.create_unique_exec_filter_image_name(
+            execution_name, filter_name, encoding, quality, size, max_fps)
+        if key not in self.dct_observer:
             logger.warning("Missing image observer : %s" % key)
-        return self.cmd_handler.remove_image_observer(observer, execution_name, filter_name)
+            return False
+        return self._remove_subscriber(key, filter_name)
+
+    def stop_filterchain_execution(self, execution_name):
+        status = self.cmd_handler.stop_filterchain_execution(execution_name)
+        if status:
+            # the observers are destroyed with the filterchain
+            for key, observer_info in self.dct_observer.items():
+                if observer_info[0] == execution_name:
+                    del self.dct_observer[key]
+                    self.publisher.deregister(key)
+        return status
+
+    def _add_subscriber(self, key, execution_name, filter_name, encoding,
+                        quality, size, max_fps):
+        # all subscribers of a key share the same observer, the image is
+        # encoded one time for all of them
+        observer_info = self.dct_observer.get(key, None)
+        if observer_info:
+            observer_info[2] += 1
+            return True
+        observer = self._cb_send_image(key, encoding, quality)
+        if not self.cmd_handler.add_image_observer(observer, execution_name,
+                                                   filter_name, size=size,
+                                                   max_fps=max_fps):
+            return False
+        # [execution_name, observer, number of subscriber]
+        self.dct_observer[key] = [execution_name, observer, 1]
+        self.publisher.register(key)
+        return True
+
+    def _remove_subscriber(self, key, filter_name):
+        observer_info = self.dct_observer[key]
+        observer_info[2] -= 1
+        if observer_info[2] > 0:
+            return True
+        del self.dct_observer[key]
+        self.publisher.deregister(key)
+        return self.cmd_handler.remove_image_observer(
+            observer_info[1], observer_info[0], filter_name)
 
-    def _compress_cvmat(self, image):
-        compress_img = cv2.imencode(".jpeg", image, (cv.CV_IMWRITE_JPEG_QUALITY, 95))
-        return compress_img[1].dumps()
+    def _cb_send_image(self, key, encoding, quality):
+        # the sequence number let the subscriber detect the missing images
+        lst_seq = [0]
 
-    def _cb_send_image(self, key):
         def _publish_image(image):
-            compress_cvmat = self._compress_cvmat(image)
-            self.publisher.publish(key, compress_cvmat)
+            # the client is gone without removing his observer
+            if not self.publisher.has_subscriber(key):
+                return
+            frame = frame_info.serialize(frame_info.get_frame_info(image))
+            header, payload = transport.encode_image(image, encoding, quality,
+                                                     lst_seq[0], frame)
+            lst_seq[0] += 1
+            self.publisher.publish_image(key, header, payload)
         return _publish_image
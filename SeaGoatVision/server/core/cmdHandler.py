@@ -25,6 +25,9 @@ from SeaGoatVision.server.tcp_server import Server
 from configuration import Configuration
 from resource import Resource
 from publisher import Publisher
+from process_filterchain import ProcessFilterChain
+from pipeline_filterchain import PipelineFilterChain
+import preview_observer
 from SeaGoatVision.commons import log
 from SeaGoatVision.commons import keys
 import inspect
@@ -35,6 +38,8 @@ logger = log.get_logger(__name__)
 
 KEY_MEDIA = "media"
 KEY_FILTERCHAIN = "filterchain"
+KEY_OUTPUT_OBSERVER = "output_observer"
+KEY_PUBLISH_OBSERVER = "publish_observer"
 
 
 class CmdHandler:
@@ -42,7 +47,9 @@ class CmdHandler:
     def __init__(self):
         """
             Structure of dct_execution
-            {"execution_name" : {KEY_FILTERCHAIN : ref, KEY_MEDIA : ref}}
+            {"execution_name" : {KEY_FILTERCHAIN : ref, KEY_MEDIA : ref,
+                                 KEY_OUTPUT_OBSERVER : ref,
+                                 KEY_PUBLISH_OBSERVER : ref}}
         """
         self.dct_exec = {}
         self.config = Configuration()
@@ -57,8 +64,10 @@ class CmdHandler:
 
         # initialize subscriber server
         self.publisher = Publisher(5031)
-        self.resource.set_all_publisher(self.publisher)
+        self.publisher.register(keys.get_key_media_state())
         self.publisher.start()
+        # the media are probed in background, don't wait them
+        self.resource.set_all_publisher(self.publisher)
 
         # launch command on start
         thread.start_new_thread(self.config.get_dct_cmd_on_start(), (self,))
@@ -74,9 +83,16 @@ class CmdHandler:
         logger.info("Close cmdHandler and close server.")
         for execution in self.dct_exec.values():
             execution[KEY_MEDIA].close()
+            # stop the threads and the worker of the filterchain
+            try:
+                execution[KEY_FILTERCHAIN].destroy()
+            except Exception as e:
+                log.printerror_stacktrace(
+                    logger, "Destroy filterchain on close: %s" % e)
         self.server_observer.stop()
         self.publisher.stop()
         self.publisher.deregister(keys.get_key_execution_list())
+        self.publisher.deregister(keys.get_key_media_state())
 
     def _post_command_(self, arg):
         funct_name = inspect.currentframe().f_back.f_code.co_name
@@ -100,8 +116,25 @@ class CmdHandler:
     # EXECUTION FILTER ################################
     #
     def start_filterchain_execution(
-            self, execution_name, media_name, filterchain_name, file_name, is_client_manager):
+            self, execution_name, media_name, filterchain_name, file_name, is_client_manager, options=None):
+        """
+        options can be like this
+            {"process": True, "pipeline": 0, "policy": "keep_latest",
+             "queue_size": 2, "scale": 0.5}
+        process : execute the filterchain in a worker process
+        pipeline : number of stages executed in parallel, 0 to disable,
+                   True for a stage per filter
+        policy : behavior when the filterchain is late on the media,
+                 block (default), drop_oldest or keep_latest
+        queue_size : number of images waiting for the filterchain
+        scale : execute the filterchain on the image resized, like 0.5 for
+                half resolution. The typed outputs of the filters are in
+                the coordinates of the media, the text outputs in the
+                resized image, the packets of records contain the scale.
+        """
         self._post_command_(locals())
+        if type(options) != dict:
+            options = {}
         execution = self.dct_exec.get(execution_name, None)
 
         if execution:
@@ -127,8 +160,8 @@ class CmdHandler:
         media = self.resource.get_media(media_name)
         if not media:
             log.print_function(
-                logger.error, "Media %s not exist or you didn't set the default media on filterchain." %
-                (media_name))
+                logger.error, "Media %s not exist or you didn't set the default media on filterchain, state %s." %
+                (media_name, self.resource.get_media_state().get(media_name)))
             return False
 
         if media.is_media_video() and file_name:
@@ -136,20 +169,53 @@ class CmdHandler:
 
         media.set_is_client_manager(is_client_manager)
 
+        scale = options.get("scale", None)
+        if scale is not None and not filterchain.set_scale(scale):
+            return False
+
+        nb_stage = options.get("pipeline", 0)
+        if nb_stage:
+            if nb_stage is True:
+                nb_stage = None
+            filterchain = PipelineFilterChain(filterchain, nb_stage=nb_stage)
+
+        if options.get("process", False):
+            filterchain = ProcessFilterChain(filterchain)
+
         filterchain.set_media_param(media.get_dct_media_param())
 
-        media.add_observer(filterchain.execute)
+        media.add_observer(filterchain.execute, name=execution_name,
+                           policy=options.get("policy", None),
+                           queue_size=options.get("queue_size", None))
+
+        # the outputs are published as records, see record
+        key = keys.create_unique_exec_output_name(execution_name)
+        self.publisher.register(key)
+        publish_observer = self.publisher.create_record_observer(
+            key, filterchain.get_scale())
+        filterchain.add_filter_output_observer(publish_observer)
 
         self.dct_exec[execution_name] = {
-            KEY_FILTERCHAIN: filterchain, KEY_MEDIA: media}
+            KEY_FILTERCHAIN: filterchain, KEY_MEDIA: media,
+            # the tcp server tells the filterchain when the output is
+            # delivered
+            KEY_OUTPUT_OBSERVER: self.server_observer.create_output_observer(
+                filterchain.add_delivery, filterchain.get_scale()),
+            KEY_PUBLISH_OBSERVER: publish_observer}
 
         self.publisher.publish(
             keys.get_key_execution_list(), "+%s" %
             execution_name)
 
-        for filter_name in filterchain.get_filter_name():
-            key = keys.create_unique_exec_filter_name(execution_name, filter_name)
-            self.publisher.register(key)
+        key = keys.create_unique_exec_profile_name(execution_name)
+        self.publisher.register(key)
+        filterchain.set_profile_publisher(
+            self.publisher.get_callback_publish(key))
+
+        key = keys.create_unique_exec_latency_name(execution_name)
+        self.publisher.register(key)
+        filterchain.set_latency_publisher(
+            self.publisher.get_callback_publish(key))
 
         return True
 
@@ -181,9 +247,14 @@ class CmdHandler:
         observer.remove_observer(filterchain.execute)
 
         # deregiste key
-        for filter_name in filterchain.get_filter_name():
-            key = keys.create_unique_exec_filter_name(execution_name, filter_name)
-            self.publisher.deregister(key)
+        filterchain.set_profile_publisher(None)
+        self.publisher.deregister(
+            keys.create_unique_exec_profile_name(execution_name))
+        filterchain.set_latency_publisher(None)
+        self.publisher.deregister(
+            keys.create_unique_exec_latency_name(execution_name))
+        self.publisher.deregister(
+            keys.create_unique_exec_output_name(execution_name))
 
         filterchain.destroy()
         del self.dct_exec[execution_name]
@@ -208,6 +279,33 @@ class CmdHandler:
             return None
         return {KEY_MEDIA: exec_info[KEY_MEDIA].get_name(), KEY_FILTERCHAIN: exec_info[KEY_FILTERCHAIN].get_name()}
 
+    def get_execution_profile(self, execution_name):
+        """
+        Percentiles of the wall time and cpu time in millisecond, and of the
+        output size in byte, of each filter on the last frames. nb_drop is
+        the number of frames dropped by the filterchain, like when his worker
+        process is late.
+        """
+        # self._post_command_(locals())
+        filterchain = self._get_filterchain(execution_name)
+        if not filterchain:
+            return {}
+        return filterchain.get_profile()
+
+    def get_execution_latency(self, execution_name):
+        """
+        Percentiles of the latency in millisecond of the frames since the
+        start of the execution: capture_to_start, from the capture of the
+        media to the start of the filterchain, start_to_end, the execution,
+        and end_to_delivery, from the end to the delivery of the outputs to
+        the clients.
+        """
+        # self._post_command_(locals())
+        filterchain = self._get_filterchain(execution_name)
+        if not filterchain:
+            return {}
+        return filterchain.get_latency()
+
     def get_fps_execution(self, execution_name):
         # self._post_command_(locals())
         media = self._get_media(execution_name=execution_name)
@@ -223,6 +321,11 @@ class CmdHandler:
         return {name: self.resource.get_media(name).get_type_media()
                 for name in self.resource.get_media_name_list()}
 
+    def get_media_state(self):
+        # {media_name : state} of the configured media, also published
+        self._post_command_(locals())
+        return self.resource.get_media_state()
+
     def cmd_to_media(self, media_name, cmd, value=None):
         # don't print when it's command frame_media, because it's spam
         if cmd != keys.get_key_media_frame():
@@ -327,18 +430,23 @@ class CmdHandler:
     #
     # OBSERVER  #################################
     #
-    def add_image_observer(self, observer, execution_name, filter_name):
+    def add_image_observer(self, observer, execution_name, filter_name,
+                           size=None, max_fps=None):
         """
             Inform the server what filter we want to observe
             Param :
                 - ref, observer is a reference on method for callback
                 - string, execution_name to select an execution
                 - string, filter_name to select the filter
+                - float or [width, height], size to reduce the image
+                - float, max_fps to skip the images
         """
         self._post_command_(locals())
         filterchain = self._get_filterchain(execution_name)
         if not filterchain:
             return False
+        observer = preview_observer.create_observer(observer, size=size,
+                                                    max_fps=max_fps)
         return filterchain.add_image_observer(observer, filter_name)
 
     def set_image_observer(
@@ -363,6 +471,10 @@ class CmdHandler:
         filterchain = self._get_filterchain(execution_name)
         if not filterchain:
             return False
+        # keep the size and the fps of the preview
+        old_observer = filterchain.get_image_observer(observer, filter_name_old)
+        if isinstance(old_observer, preview_observer.PreviewObserver):
+            new_observer = old_observer.create_preview(new_observer)
         filterchain.remove_image_observer(observer, filter_name_old)
         return filterchain.add_image_observer(new_observer, filter_name_new)
 
@@ -391,9 +503,9 @@ class CmdHandler:
             return False
 
         status = True
-        if self.server_observer.send not in filterchain.get_filter_output_observers():
-            status = filterchain.add_filter_output_observer(
-                self.server_observer.send)
+        observer = self.dct_exec[execution_name][KEY_OUTPUT_OBSERVER]
+        if observer not in filterchain.get_filter_output_observers():
+            status = filterchain.add_filter_output_observer(observer)
         self.nb_observer_client += 1
         return status
 
@@ -406,14 +518,15 @@ class CmdHandler:
         filterchain = self._get_filterchain(execution_name)
         if not filterchain:
             return False
-        if not filterchain.get_filter_output_observers():
+        observer = self.dct_exec[execution_name][KEY_OUTPUT_OBSERVER]
+        if observer not in filterchain.get_filter_output_observers():
             return True
         self.nb_observer_client -= 1
         if self.nb_observer_client <= 0:
             # protection if go under zero
             if self.nb_observer_client < 0:
                 self.nb_observer_client = 0
-            return filterchain.remove_filter_output_observer(self.server_observer.send)
+            return filterchain.remove_filter_output_observer(observer)
         return True
 
     #
@@ -552,10 +665,12 @@ class CmdHandler:
         if media_name:
             media = self.resource.get_media(media_name)
             if not media:
+                # the state is probing when the media isn't ready yet
+                state = self.resource.get_media_state().get(media_name)
                 log.print_function(
                     logger.error,
-                    "Cannot found the media %s." %
-                    media_name,
+                    "Cannot found the media %s, state %s." %
+                    (media_name, state),
                     last_stack=True)
                 return None
         elif execution_name:
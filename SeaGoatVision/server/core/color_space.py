@@ -0,0 +1,67 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Color spaces of the images in a filterchain and the cv2.cvtColor
+code between them
+"""
+
+import numpy as np
+from cv2 import cv
+
+BGR = "BGR"
+RGB = "RGB"
+HSV = "HSV"
+YCRCB = "YCrCb"
+GRAY = "GRAY"
+
+# {(from, to) : code of cv2.cvtColor}
+_DCT_CODE = {
+    (BGR, RGB): cv.CV_BGR2RGB,
+    (RGB, BGR): cv.CV_RGB2BGR,
+    (BGR, HSV): cv.CV_BGR2HSV,
+    (HSV, BGR): cv.CV_HSV2BGR,
+    (RGB, HSV): cv.CV_RGB2HSV,
+    (HSV, RGB): cv.CV_HSV2RGB,
+    (BGR, YCRCB): cv.CV_BGR2YCrCb,
+    (YCRCB, BGR): cv.CV_YCrCb2BGR,
+    (RGB, YCRCB): cv.CV_RGB2YCrCb,
+    (YCRCB, RGB): cv.CV_YCrCb2RGB,
+    (BGR, GRAY): cv.CV_BGR2GRAY,
+    (GRAY, BGR): cv.CV_GRAY2BGR,
+    (RGB, GRAY): cv.CV_RGB2GRAY,
+    (GRAY, RGB): cv.CV_GRAY2RGB,
+}
+
+
+def get_code(from_space, to_space):
+    # None when there is no direct conversion
+    return _DCT_CODE.get((from_space, to_space), None)
+
+
+def get_color_space(image, color_space=None):
+    # the shape of the image corrects the known color space, the media send
+    # BGR images
+    if not isinstance(image, np.ndarray):
+        return color_space
+    if image.ndim == 2 or (image.ndim == 3 and image.shape[2] == 1):
+        return GRAY
+    if color_space is None or color_space == GRAY:
+        return BGR
+    return color_space
@@ -17,7 +17,9 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import numpy as np
 from SeaGoatVision.commons.param import Param
+from SeaGoatVision.commons import record
 from SeaGoatVision.commons import log
 
 logger = log.get_logger(__name__)
@@ -25,9 +27,34 @@ logger = log.get_logger(__name__)
 
 class Filter(object):
 
+    # The image received by execute can be shared with other executions.
+    # When True, the filterchain gives a private copy of the image to this
+    # filter, else the filter receives a read-only image and must return
+    # a new one if it needs to change it.
+    # The media reuses the image memory after the execution, copy it to keep
+    # it for the next frames.
+    modify_input = True
+
+    # Color space of the image expected by execute, like color_space.BGR.
+    # The filterchain converts the image when it knows it's another one.
+    input_color_space = None
+
+    # When True, the filterchain executes the filter only on the region of
+    # interest set by a previous filter, see set_roi. execute receives this
+    # part of the image and returns an image of the same shape, the pixels
+    # outside are kept.
+    roi_support = False
+
     def __init__(self, name=None):
         self._output_observers = list()
         self.original_image = None
+        # FrameInfo of the executed frame, None without media
+        self.frame_info = None
+        self.roi = None
+        # the filterchain can execute on the image of the media resized
+        self.scale = 1.0
+        # a text output is not converted to the coordinates of the media
+        self._is_text_scale_warned = False
         self.name = name
         self.dct_global_param = {}
         self.dct_media_param = {}
@@ -74,6 +101,29 @@ class Filter(object):
         # edit me
         return image
 
+    def get_lut(self):
+        # edit me
+        # Return a uint8 table of 256 values, or of 256x3 values for the
+        # channels BGR, when execute maps each value of the image alone, like
+        # execute_lut(cv2.LUT(image, lut)). The filterchain merges the tables
+        # of the following filters in one cv2.LUT without calling execute.
+        # The table depends only on the params of the filter, it's asked
+        # again when one of them changes.
+        return None
+
+    def get_color_conversion(self, from_space):
+        # edit me
+        # Return the color space of the output when execute only converts
+        # an image of from_space with cv2.cvtColor, else None. The
+        # filterchain merges the following conversions in one cvtColor.
+        return None
+
+    def execute_lut(self, image):
+        # edit me
+        # The part of execute done after the table, like combining the
+        # channels. A filter overriding it ends the merged tables.
+        return image
+
     def set_global_params(self, dct_global_param):
         # complete the list and point on it
         for key, param in self.dct_global_param.items():
@@ -103,18 +153,42 @@ class Filter(object):
     def get_global_params(self, param_name):
         return self.dct_global_param.get(param_name, None)
 
+    def add_param(self, name, param):
+        # for a param assigned after the first call of get_params, the params
+        # assigned in __init__ are found without it
+        setattr(self, name, param)
+        self._lst_param = None
+
+    def get_params_version(self):
+        # changes when a param of the filter changes
+        return tuple([param.get_version() for param in self.get_params()])
+
     def get_params(self, param_name=None):
-        params = []
-        for name in dir(self):
-            var = getattr(self, name)
-            if not isinstance(var, Param):
-                continue
-            if param_name:
-                if var.get_name() == param_name:
-                    return var
-            else:
-                params.append(var)
-        return params
+        # the index is built on the first call, after the construction
+        if getattr(self, "_lst_param", None) is None or \
+                self._param_class is not self.__class__:
+            self._build_param_index()
+        if param_name:
+            return self._dct_name_param.get(param_name, [])
+        return list(self._lst_param)
+
+    def _build_param_index(self):
+        # same order as dir(), the params of the class are included
+        dct_param = {}
+        for cls in reversed(self.__class__.__mro__):
+            for name, var in vars(cls).items():
+                if isinstance(var, Param) and name not in self.__dict__:
+                    dct_param[name] = var
+        for name, var in self.__dict__.items():
+            if isinstance(var, Param):
+                dct_param[name] = var
+        lst_param = [dct_param[name] for name in sorted(dct_param.keys())]
+        dct_name_param = {}
+        for param in lst_param:
+            dct_name_param.setdefault(param.get_name(), param)
+        self._dct_name_param = dct_name_param
+        self._param_class = self.__class__
+        self._lst_param = lst_param
 
     def set_media_param(self, dct_media_param):
         self.dct_media_param = dct_media_param
@@ -128,9 +202,84 @@ class Filter(object):
     def get_original_image(self):
         return self.original_image
 
+    def set_frame_info(self, frame_info):
+        self.frame_info = frame_info
+
+    def get_frame_info(self):
+        # capture of the executed frame: timestamp, seq and media_name
+        return self.frame_info
+
+    def set_scale(self, scale):
+        self.scale = scale
+
+    def get_scale(self):
+        return self.scale
+
+    def to_source(self, value):
+        # coordinates in the executed image to coordinates in the image of
+        # the media, for the outputs. value is a number, a numpy array or a
+        # list or tuple of them.
+        if self.scale == 1:
+            return value
+        if isinstance(value, (list, tuple)):
+            return type(value)([self.to_source(item) for item in value])
+        return value / float(self.scale)
+
+    def set_roi(self, roi):
+        # (x, y, width, height) in the image of the filterchain, or None for
+        # all the image. Called before execute with the roi of the previous
+        # filters, a filter can call it in execute to change the roi of the
+        # next filters.
+        self.roi = roi
+
+    def get_roi(self):
+        return self.roi
+
     def notify_output_observers(self, data):
+        # an output observer receives the data and the FrameInfo of the
+        # frame producing it. data is a string or a record.Record
+        if self.scale != 1 and not self._is_text_scale_warned and \
+                not isinstance(data, record.Record):
+            self._is_text_scale_warned = True
+            log.print_function(
+                logger.warning, "The text outputs of %s are in the image "
+                "resized by %s, use output_point, output_line... to send the "
+                "coordinates of the media." % (self.get_name(), self.scale))
         for obs in self._output_observers:
-            obs(data)
+            obs(data, self.frame_info)
+
+    # The typed outputs, the clients receive them without parsing a text.
+    # The coordinates are in the executed image, they are sent in the
+    # coordinates of the media, see to_source.
+    # text_format keeps the line of the text clients, see record.Record
+    def output_point(self, name, x, y, text_format=None):
+        self._notify_record(name, record.TYPE_POINT, self._to_source(x, y),
+                            text_format)
+
+    def output_line(self, name, x1, y1, x2, y2, text_format=None):
+        self._notify_record(name, record.TYPE_LINE,
+                            self._to_source(x1, y1, x2, y2), text_format)
+
+    def output_rect(self, name, x, y, width, height, text_format=None):
+        self._notify_record(name, record.TYPE_RECT,
+                            self._to_source(x, y, width, height), text_format)
+
+    def output_scalar(self, name, value, text_format=None):
+        self._notify_record(name, record.TYPE_SCALAR, float(value),
+                            text_format)
+
+    def output_array(self, name, array):
+        # a copy, the filter can modify his array after
+        self._notify_record(name, record.TYPE_ARRAY, np.array(array))
+
+    def _notify_record(self, name, type_record, value, text_format=None):
+        if not self._output_observers:
+            return
+        self.notify_output_observers(
+            record.Record(self.name, name, type_record, value, text_format))
+
+    def _to_source(self, *values):
+        return tuple([float(value) for value in self.to_source(values)])
 
     def get_list_output_observer(self):
         return self._output_observers
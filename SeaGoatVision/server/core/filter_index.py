@@ -0,0 +1,221 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Index of the filters read from their source code, without
+importing them. The index is saved on disk and a file is parsed again when
+his modification time change.
+"""
+
+import ast
+import json
+import os
+import re
+from SeaGoatVision.commons import log
+
+logger = log.get_logger(__name__)
+
+INDEX_FILE = os.path.join('build', 'filter_index.json')
+# change it when the format of the index change
+INDEX_VERSION = 1
+FILTER_BASE_CLASS = "Filter"
+CPP_EXECUTE = "cv::Mat execute(cv::Mat "
+CPP_DOCSTRING = re.compile(r'#define\s+DOCSTRING\s+"((?:[^"\\]|\\.)*)"')
+
+
+class FilterIndex(object):
+
+    """Find the filters of the filters packages.
+    A python filter is a class with an execute method, inheriting of Filter
+    or of another filter. A c++ filter is a .cpp file with an execute
+    function.
+    The info of a filter is a dict:
+     - module : name of the module to import, the package for a c++ filter
+     - doc : documentation of the filter
+     - params : [{"name", "value"}] of the Param created in the source code,
+       value is None when it's not a literal
+     - cpp : True for a c++ filter
+    """
+
+    def __init__(self, index_file=INDEX_FILE):
+        self.index_file = index_file
+        # {path : {"mtime", "module", "classes" or "cpp"}}
+        self.dct_file = {}
+        # {filter_name : info}
+        self.dct_filter = {}
+
+    def load(self, lst_package):
+        # lst_package is a list of (package_name, directory)
+        dct_cache = self._read_cache()
+        self.dct_file = {}
+        for package_name, directory in lst_package:
+            self._scan_package(package_name, directory, dct_cache)
+        self._write_cache()
+        self.dct_filter = self._resolve_filters()
+        return self.dct_filter
+
+    def get_filter_info(self, filter_name):
+        return self.dct_filter.get(filter_name, None)
+
+    def get_lst_filter_name(self):
+        return self.dct_filter.keys()
+
+    def _scan_package(self, package_name, directory, dct_cache):
+        for f in sorted(os.listdir(directory)):
+            path = os.path.join(directory, f)
+            name, ext = os.path.splitext(f)
+            if os.path.isdir(path):
+                if os.path.isfile(os.path.join(path, "__init__.py")):
+                    self._scan_package("%s.%s" % (package_name, f), path,
+                                       dct_cache)
+                continue
+            if ext == ".py" and f != "__init__.py":
+                module = "%s.%s" % (package_name, name)
+            elif ext == ".cpp":
+                module = package_name
+            else:
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            entry = dct_cache.get(path, None)
+            if entry is None or entry.get("mtime") != mtime or \
+                    entry.get("module") != module:
+                entry = self._parse_file(path, ext, name)
+                entry["mtime"] = mtime
+                entry["module"] = module
+            self.dct_file[path] = entry
+
+    def _parse_file(self, path, ext, name):
+        try:
+            with open(path) as f:
+                source = f.read()
+        except IOError as e:
+            log.print_function(logger.error, "Read filter %s: %s" % (path, e))
+            return {"classes": []}
+        if ext == ".cpp":
+            if CPP_EXECUTE not in source:
+                return {"classes": []}
+            match = CPP_DOCSTRING.search(source)
+            doc = match.group(1).decode("string_escape") if match else ""
+            return {"cpp": {"name": name, "doc": doc}}
+        try:
+            tree = ast.parse(source, path)
+        except SyntaxError as e:
+            log.print_function(logger.error, "Parse filter %s: %s" % (path, e))
+            return {"classes": []}
+        lst_class = []
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef) or node.name.startswith("_"):
+                continue
+            lst_method = [item.name for item in node.body
+                          if isinstance(item, ast.FunctionDef)]
+            lst_class.append({"name": node.name,
+                              "bases": [_get_name(base) for base in node.bases],
+                              "execute": "execute" in lst_method,
+                              "doc": ast.get_docstring(node, clean=False),
+                              "params": _get_params(node)})
+        return {"classes": lst_class}
+
+    def _resolve_filters(self):
+        # a class inheriting of a filter is a filter, like issubclass
+        dct_class = {}
+        dct_filter = {}
+        for entry in self.dct_file.values():
+            cpp = entry.get("cpp", None)
+            if cpp:
+                dct_filter[cpp["name"]] = {"module": entry["module"],
+                                           "doc": cpp["doc"],
+                                           "params": [],
+                                           "cpp": True}
+            for info in entry.get("classes", []):
+                dct_class[info["name"]] = (entry["module"], info)
+
+        set_filter_class = {FILTER_BASE_CLASS}
+        changed = True
+        while changed:
+            changed = False
+            for name, (_, info) in dct_class.items():
+                if name in set_filter_class:
+                    continue
+                if set_filter_class.intersection(info["bases"]):
+                    set_filter_class.add(name)
+                    changed = True
+
+        for name, (module, info) in dct_class.items():
+            if name not in set_filter_class or not info["execute"]:
+                continue
+            dct_filter[name] = {"module": module,
+                                "doc": info["doc"],
+                                "params": info["params"],
+                                "cpp": False}
+        return dct_filter
+
+    def _read_cache(self):
+        if not os.path.isfile(self.index_file):
+            return {}
+        try:
+            with open(self.index_file) as f:
+                data = json.load(f)
+        except (IOError, ValueError) as e:
+            log.print_function(logger.warning, "Read filter index %s: %s" %
+                               (self.index_file, e))
+            return {}
+        if data.get("version") != INDEX_VERSION:
+            return {}
+        return data.get("files", {})
+
+    def _write_cache(self):
+        data = {"version": INDEX_VERSION, "files": self.dct_file}
+        try:
+            directory = os.path.dirname(self.index_file)
+            if directory and not os.path.exists(directory):
+                os.mkdir(directory)
+            with open(self.index_file, "w") as f:
+                json.dump(data, f)
+        except (IOError, OSError) as e:
+            log.print_function(logger.warning, "Write filter index %s: %s" %
+                               (self.index_file, e))
+
+
+def _get_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _get_params(class_node):
+    # the Param(name, value, ...) created in the class, like in __init__
+    lst_param = []
+    for node in ast.walk(class_node):
+        if not isinstance(node, ast.Call) or _get_name(node.func) != "Param":
+            continue
+        if not node.args or not isinstance(node.args[0], ast.Str):
+            continue
+        value = None
+        if len(node.args) > 1:
+            try:
+                value = ast.literal_eval(node.args[1])
+            except ValueError:
+                pass
+        lst_param.append({"name": node.args[0].s, "value": value})
+    return lst_param
@@ -20,7 +20,17 @@
 """Contains the FilterChain class and helper functions to work with the filter chain."""
 
 from SeaGoatVision.server.core.filter import Filter
+from SeaGoatVision.server.core.color_space import RGB
+from SeaGoatVision.server.core.color_space import get_code
+from SeaGoatVision.server.core.color_space import get_color_space
+from SeaGoatVision.server.core.profiler import Profiler
+from SeaGoatVision.server.core.profiler import get_cpu_time
+from SeaGoatVision.server.core.latency import LatencyTracker
+from SeaGoatVision.server.media.frame_info import create_frame
+from SeaGoatVision.server.media.frame_info import get_frame_info
 from SeaGoatVision.commons import keys
+import threading
+import time
 import cv2
 from cv2 import cv
 import numpy as np
@@ -50,6 +60,13 @@ class FilterChain(object):
         self.original_image_observer = []
         self.dct_global_param = {}
         self.dct_media_param = {}
+        self.profiler = Profiler()
+        self.latency = LatencyTracker()
+        # {names of the filters : ([filter], [params version], table)} of
+        # the merged tables
+        self.dct_lut_cache = {}
+        # the image of the media is resized by scale before the execution
+        self.scale = 1.0
         # If starting filterchain with empty media_name, we take the default
         # media
         self.default_media_name = default_media_name
@@ -58,11 +75,11 @@ class FilterChain(object):
             self.deserialize(filterchain_name, serialize)
         else:
             # add default filter
-            self.add_filter(Filter(keys.get_empty_filter_name()))
+            self.add_filter(self._create_empty_filter())
 
     def destroy(self):
         # clean everything!
-        for obs in self.filter_output_observers:
+        for obs in self.filter_output_observers[:]:
             self.remove_filter_output_observer(obs)
 
         for obs in self.original_image_observer:
@@ -91,7 +108,7 @@ class FilterChain(object):
         self.filters = []
         index = 0
         # add default filter
-        self.add_filter(Filter(keys.get_empty_filter_name()))
+        self.add_filter(self._create_empty_filter())
         for filter_to_ser in lst_filter:
             filter_name = filter_to_ser.get("filter_name", None)
             o_filter = self.resource.create_filter(filter_name, index)
@@ -147,9 +164,79 @@ class FilterChain(object):
     def set_default_media_name(self, name):
         self.default_media_name = name
 
+    def set_scale(self, scale):
+        # execute on the image resized, like 0.5 for half resolution
+        try:
+            scale = float(scale)
+        except (TypeError, ValueError):
+            scale = 0
+        if not 0 < scale <= 1:
+            log.print_function(
+                logger.error,
+                "The scale %s must be between 0 and 1." % scale)
+            return False
+        self.scale = scale
+        for o_filter in self.filters:
+            o_filter.set_scale(scale)
+        return True
+
+    def get_scale(self):
+        return self.scale
+
+    def scale_image(self, image):
+        if self.scale == 1 or not isinstance(image, np.ndarray) or \
+                not image.size:
+            return image
+        dsize = (max(1, int(image.shape[1] * self.scale)),
+                 max(1, int(image.shape[0] * self.scale)))
+        image = cv2.resize(image, dsize, interpolation=cv2.INTER_AREA)
+        # it's also the original image of the filters, like the frame of the
+        # media it's copied before a filter that modify it
+        image.flags.writeable = False
+        return image
+
+    def get_profile(self):
+        return self.profiler.get_summary()
+
+    def set_profile_publisher(self, cb_publish):
+        self.profiler.set_publisher(cb_publish)
+
+    def get_latency(self):
+        return self.latency.get_summary()
+
+    def set_latency_publisher(self, cb_publish):
+        self.latency.set_publisher(cb_publish)
+
+    def add_delivery(self, frame_info, delivery_time=None):
+        # an output of the frame is delivered to the clients
+        self.latency.add_delivery(frame_info, delivery_time)
+
     def get_filter_output_observers(self):
         return self.filter_output_observers
 
+    def reinit_after_fork(self):
+        # new locks in a forked process, see ProcessFilterChain
+        self.profiler.lock = threading.Lock()
+        self.latency.lock = threading.Lock()
+
+    def notify_end_frame(self, frame_info):
+        # the outputs of the frame are all sent, an observer with end_frame
+        # can write them in one time
+        if frame_info is None:
+            return
+        for output in self.filter_output_observers:
+            end_frame = getattr(output, "end_frame", None)
+            if end_frame:
+                end_frame(frame_info)
+
+    def has_active_output_observer(self):
+        # an observer with is_active can ignore the outputs for now
+        for output in self.filter_output_observers:
+            is_active = getattr(output, "is_active", None)
+            if is_active is None or is_active():
+                return True
+        return False
+
     def get_filter_list(self):
         class Filter:
             def __init__(self):
@@ -188,11 +275,18 @@ class FilterChain(object):
             return_data = self.filters
         return return_data
 
+    def _create_empty_filter(self):
+        o_filter = Filter(keys.get_empty_filter_name())
+        # the default filter return the image without touching it
+        o_filter.modify_input = False
+        return o_filter
+
     def get_filter_name(self):
         return [o_filter.get_name() for o_filter in self.filters]
 
     def add_filter(self, o_filter):
         self.filters.append(o_filter)
+        o_filter.set_scale(self.scale)
         o_filter.set_global_params(self.dct_global_param)
 
     def remove_filter(self, o_filter):
@@ -212,8 +306,10 @@ class FilterChain(object):
                 # index -1 to ignore the default filter
                 o_filter.set_name("%s-%d" % (o_filter.get_name(), index - 1))
                 obj = self.filters[index]
+                o_filter.set_scale(self.scale)
                 self.filters[index] = o_filter
                 del obj
+                self.profiler.clear()
                 # re-add observer
                 for output in filter_output_obs_copy:
                     self.add_filter_output_observer(output)
@@ -242,6 +338,17 @@ class FilterChain(object):
             lst_observer.append(observer)
         return True
 
+    def get_image_observer(self, observer, filter_name):
+        # return the observer added, it can wrap the observer
+        if keys.get_filter_original_name() == filter_name:
+            lst_observer = self.original_image_observer
+        else:
+            lst_observer = self.image_observers.get(filter_name, [])
+        for item in lst_observer:
+            if item == observer:
+                return item
+        return None
+
     def remove_image_observer(self, observer, filter_name):
         b_original = False
         if keys.get_filter_original_name() == filter_name:
@@ -277,31 +384,350 @@ class FilterChain(object):
         return True
 
     def execute(self, image):
-        original_image = np.copy(image)
+        # the image is shared in read-only with the other observers of the
+        # media, it's copied only before a filter that modify it
+        start_time = time.time()
+        # the capture of the frame, None when it's not from a media
+        frame_info = get_frame_info(image)
+        image = self.scale_image(image)
+        original_image = image
         # first image observator
         if self.original_image_observer:
-            self.send_image(original_image, self.original_image_observer)
+            self.send_image(original_image, self.original_image_observer,
+                            frame_info=frame_info)
+
+        lst_param = self.pin_params(self.filters)
+        try:
+            next_image = self.execute_filters(self.filters, image,
+                                              original_image,
+                                              {"info": frame_info})
+            if next_image is not None:
+                image = next_image
+        finally:
+            self.unpin_params(lst_param)
+        end_time = time.time()
+        self.profiler.add_frame(end_time - start_time)
+        self.latency.add_execution(frame_info, start_time, end_time)
+        self.notify_end_frame(frame_info)
+        return image
 
-        for f in self.filters:
-            f.set_original_image(original_image)
-            try:
-                image = f.execute(image)
-            except Exception as e:
-                msg = "(Exec exception Filter %s) %s" % (f.get_name(), e)
-                log.printerror_stacktrace(logger, msg, check_duplicate=True)
-                break
+    def execute_filters(self, lst_filter, image, original_image,
+                        dct_frame=None):
+        # return None when a filter fails, the next filters are ignored.
+        # dct_frame describes the image between the filters, it's updated:
+        #  - color_space : see color_space, BGR from the media
+        #  - roi : (x, y, width, height) set by a filter, or None
+        #  - info : FrameInfo of the capture, or None
+        # The color conversions are delayed until a filter use the image, to
+        # merge them in one cvtColor or skip them when they cancel out. The
+        # following filters with a table are executed by one cv2.LUT.
+        if dct_frame is None:
+            dct_frame = {}
+        color_space = get_color_space(image, dct_frame.get("color_space"))
+        dct_frame["color_space"] = color_space
+        frame_info = dct_frame.get("info")
+        for o_filter in lst_filter:
+            o_filter.set_frame_info(frame_info)
+        # conversion delayed from color_space to target
+        lst_conversion = []
+        target = color_space
+        index = 0
+        while index < len(lst_filter):
+            o_filter = lst_filter[index]
+            next_space = o_filter.get_color_conversion(target)
+            if next_space is not None:
+                lst_conversion.append(o_filter)
+                target = next_space
+                index += 1
+                lst_observer = self.image_observers.get(o_filter.get_name())
+                if not lst_observer:
+                    continue
+                image = self.execute_conversion(lst_conversion, image,
+                                                original_image, color_space,
+                                                target)
+                lst_conversion = []
+                color_space = dct_frame["color_space"] = target
+                if image is None:
+                    return None
+                self.send_image(image, lst_observer, color_space, frame_info)
+                continue
+
+            expected = o_filter.input_color_space
+            if expected and expected != target and \
+                    get_code(target, expected) is not None:
+                target = expected
+            if lst_conversion or target != color_space:
+                image = self.execute_conversion(lst_conversion, image,
+                                                original_image, color_space,
+                                                target)
+                lst_conversion = []
+                color_space = dct_frame["color_space"] = target
+                if image is None:
+                    return None
+
+            lst_lut_filter = self._get_lut_filters(lst_filter, index, image)
+            if len(lst_lut_filter) > 1:
+                image = self.execute_lut_filters(lst_lut_filter, image,
+                                                 original_image, dct_frame)
+                index += len(lst_lut_filter)
+            else:
+                image = self.execute_filter(o_filter, image, original_image,
+                                            dct_frame)
+                index += 1
+            if image is None:
+                return None
+            color_space = target = get_color_space(image, color_space)
+            dct_frame["color_space"] = color_space
+
+        if lst_conversion:
+            image = self.execute_conversion(lst_conversion, image,
+                                            original_image, color_space,
+                                            target)
+            dct_frame["color_space"] = target
+        return image
+
+    def execute_conversion(self, lst_filter, image, original_image,
+                           from_space, to_space):
+        # convert the image like the conversion filters of the list, then in
+        # to_space
+        for o_filter in lst_filter:
+            o_filter.set_original_image(original_image)
+        if from_space == to_space:
+            # the conversions cancel out
+            return image
+        code = get_code(from_space, to_space)
+        if code is None:
+            # no direct conversion, execute the filters
+            for o_filter in lst_filter:
+                next_space = o_filter.get_color_conversion(from_space)
+                dct_frame = {"color_space": next_space,
+                             "info": o_filter.get_frame_info()}
+                image = self.execute_filter(o_filter, image, original_image,
+                                            dct_frame)
+                if image is None:
+                    return None
+                from_space = next_space
+            code = get_code(from_space, to_space)
+            if from_space == to_space or code is None:
+                return image
+            lst_filter = []
+
+        if lst_filter:
+            name = "+".join([item.get_name() for item in lst_filter])
+        else:
+            name = "%s2%s" % (from_space, to_space)
+        start_time = time.time()
+        start_cpu_time = get_cpu_time()
+        try:
+            # cvtColor creates a new image
+            image = cv2.cvtColor(image, code)
+        except Exception as e:
+            msg = "(Exec exception Filter %s) %s" % (name, e)
+            log.printerror_stacktrace(logger, msg, check_duplicate=True)
+            return None
+        self.profiler.add_sample(name, time.time() - start_time,
+                                 get_cpu_time() - start_cpu_time, image.nbytes)
+        return image
+
+    def pin_params(self, lst_filter):
+        # the filters read the same values of params during all the frame,
+        # the modifications are applied on the next frame
+        lst_param = list(self.dct_global_param.values())
+        lst_param.extend(self.dct_media_param.values())
+        for o_filter in lst_filter:
+            lst_param.extend(o_filter.get_params())
+        for param in lst_param:
+            param.pin()
+        return lst_param
+
+    def unpin_params(self, lst_param):
+        for param in lst_param:
+            param.unpin()
+
+    def execute_filter(self, o_filter, image, original_image,
+                       dct_frame=None):
+        # return None when the filter fails, the next filters are ignored
+        if dct_frame is None:
+            dct_frame = {}
+        o_filter.set_original_image(original_image)
+        roi = self._get_roi(image, dct_frame, [o_filter])
+        o_filter.set_roi(dct_frame.get("roi"))
+        if roi is None and o_filter.modify_input and \
+                not self._is_writable(image):
+            image = np.copy(image)
+        start_time = time.time()
+        start_cpu_time = get_cpu_time()
+        try:
+            if roi is None:
+                image = o_filter.execute(image)
+            else:
+                image = self._execute_roi(o_filter.execute, image, roi,
+                                          o_filter.modify_input)
+        except Exception as e:
+            msg = "(Exec exception Filter %s) %s" % (o_filter.get_name(), e)
+            log.printerror_stacktrace(logger, msg, check_duplicate=True)
+            return None
+        size = image.nbytes if isinstance(image, np.ndarray) else 0
+        self.profiler.add_sample(o_filter.get_name(),
+                                 time.time() - start_time,
+                                 get_cpu_time() - start_cpu_time, size)
+        # the filter can change the roi of the next filters
+        dct_frame["roi"] = o_filter.get_roi()
+
+        lst_observer = self.image_observers.get(o_filter.get_name(), [])
+        if lst_observer:
+            color_space = get_color_space(image, dct_frame.get("color_space"))
+            self.send_image(image, lst_observer, color_space,
+                            dct_frame.get("info"))
+        return image
+
+    def execute_lut_filters(self, lst_filter, image, original_image,
+                            dct_frame=None):
+        # the tables are merged in one, then the last filter finishes his
+        # execution
+        if dct_frame is None:
+            dct_frame = {}
+        for o_filter in lst_filter:
+            o_filter.set_original_image(original_image)
+        o_filter = lst_filter[-1]
+        roi = self._get_roi(image, dct_frame, lst_filter)
+        name = "+".join([item.get_name() for item in lst_filter])
+        start_time = time.time()
+        start_cpu_time = get_cpu_time()
+        try:
+            lut = self._get_composed_lut(lst_filter)
+
+            def execute(sub_image):
+                # cv2.LUT creates a new image
+                return o_filter.execute_lut(cv2.LUT(sub_image, lut))
+            if roi is None:
+                image = execute(image)
+            else:
+                image = self._execute_roi(execute, image, roi, False)
+        except Exception as e:
+            msg = "(Exec exception Filter %s) %s" % (name, e)
+            log.printerror_stacktrace(logger, msg, check_duplicate=True)
+            return None
+        size = image.nbytes if isinstance(image, np.ndarray) else 0
+        self.profiler.add_sample(name, time.time() - start_time,
+                                 get_cpu_time() - start_cpu_time, size)
+
+        lst_observer = self.image_observers.get(o_filter.get_name(), [])
+        if lst_observer:
+            self.send_image(image, lst_observer, dct_frame.get("color_space"),
+                            dct_frame.get("info"))
+        return image
 
-            lst_observer = self.image_observers.get(f.get_name(), [])
-            if lst_observer:
-                self.send_image(image, lst_observer)
+    def _get_composed_lut(self, lst_filter):
+        # the tables are composed again only when a param changes
+        key = tuple([item.get_name() for item in lst_filter])
+        lst_version = [item.get_params_version() for item in lst_filter]
+        cache = self.dct_lut_cache.get(key, None)
+        if cache is not None:
+            lst_cache_filter, lst_cache_version, lut = cache
+            # a reloaded filter is another object
+            if lst_cache_version == lst_version and all(
+                    [a is b for a, b in zip(lst_cache_filter, lst_filter)]):
+                return lut
+        lut = compose_lut([item.get_lut() for item in lst_filter])
+        if lut.ndim == 2:
+            lut = lut.reshape((256, 1, 3))
+        self.dct_lut_cache[key] = (list(lst_filter), lst_version, lut)
+        return lut
+
+    def _get_roi(self, image, dct_frame, lst_filter):
+        # the roi inside the image when all the filters support it, else None
+        roi = dct_frame.get("roi")
+        if roi is None or not isinstance(image, np.ndarray) or image.ndim < 2:
+            return None
+        for o_filter in lst_filter:
+            if not o_filter.roi_support:
+                return None
+        x, y, width, height = [int(value) for value in roi]
+        x = min(max(x, 0), image.shape[1])
+        y = min(max(y, 0), image.shape[0])
+        width = min(width, image.shape[1] - x)
+        height = min(height, image.shape[0] - y)
+        if width <= 0 or height <= 0:
+            return None
+        if width == image.shape[1] and height == image.shape[0]:
+            return None
+        return x, y, width, height
+
+    def _execute_roi(self, execute, image, roi, modify_input):
+        # execute on the roi, the pixels outside are kept
+        x, y, width, height = roi
+        view = image[y:y + height, x:x + width]
+        sub_image = view
+        # opencv copies an image not contiguous, the changes would be lost
+        if not view.flags.c_contiguous or \
+                (modify_input and not view.flags.writeable):
+            sub_image = np.copy(view)
+        result = execute(sub_image)
+        if result is view:
+            return image
+        if not isinstance(result, np.ndarray) or result.shape != view.shape:
+            raise ValueError("A filter supporting the roi must return an "
+                             "image of the shape of the roi.")
+        if not image.flags.writeable:
+            image = np.copy(image)
+        image[y:y + height, x:x + width] = result
         return image
 
-    def send_image(self, image, lst_observer):
+    def _get_lut_filters(self, lst_filter, index, image):
+        # the following filters with a table usable on this image, stop on
+        # a filter with observers or with a part after the table
+        if not isinstance(image, np.ndarray) or image.dtype != np.uint8:
+            return []
+        nb_channel = image.shape[2] if image.ndim == 3 else 1
+        lst_lut_filter = []
+        for o_filter in lst_filter[index:]:
+            lut = o_filter.get_lut()
+            if lut is None:
+                break
+            if np.ndim(lut) == 2 and nb_channel != 3:
+                break
+            lst_lut_filter.append(o_filter)
+            if _has_execute_lut(o_filter) or \
+                    self.image_observers.get(o_filter.get_name()):
+                break
+        return lst_lut_filter
+
+    def send_image(self, image, lst_observer, color_space=None,
+                   frame_info=None):
         if not isinstance(image, np.ndarray) or not image.size or image.ndim != 3:
             return
-            # copy the picture because the next filter will modify him
-        # transform it in rgb
-        image2 = np.copy(image)
-        cv2.cvtColor(np.copy(image), cv.CV_BGR2RGB, image2)
+        # transform it in rgb, the conversion creates a new image so the next
+        # filter can modify his own without changing the observed one
+        if color_space == RGB:
+            image2 = np.copy(image)
+        else:
+            image2 = cv2.cvtColor(image, cv.CV_BGR2RGB)
+        # the observers find the capture of the frame in image2.info
+        image2 = create_frame(image2, frame_info)
         for observer in lst_observer:
             observer(image2)
+
+    def _is_writable(self, image):
+        if not isinstance(image, np.ndarray):
+            return True
+        return image.flags.writeable
+
+
+def compose_lut(lst_lut):
+    # one table doing the tables of the list in order, 256 or 256x3 values
+    lut = np.arange(256, dtype=np.uint8)
+    for next_lut in lst_lut:
+        next_lut = np.asarray(next_lut, dtype=np.uint8)
+        if next_lut.ndim == 1:
+            lut = next_lut[lut]
+            continue
+        if lut.ndim == 1:
+            lut = np.repeat(lut[:, np.newaxis], 3, axis=1)
+        lut = next_lut[lut, np.arange(3)]
+    return lut
+
+
+def _has_execute_lut(o_filter):
+    return getattr(o_filter.execute_lut, "im_func", None) is not \
+        Filter.execute_lut.im_func
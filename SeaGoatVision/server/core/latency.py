@@ -0,0 +1,219 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Latency of the frames of an execution, from the capture by the
+media to the delivery of the outputs, kept in histograms of fixed size
+"""
+
+import collections
+import threading
+import time
+import numpy as np
+from SeaGoatVision.commons import log
+
+logger = log.get_logger(__name__)
+
+# the latency are recorded in microsecond
+MAX_LATENCY = 60 * 1000000
+# 2^SUB_BUCKET_BITS values per power of 2, the error is under 1/64
+SUB_BUCKET_BITS = 7
+LST_PERCENTILE = [50, 90, 99, 99.9]
+PUBLISH_DELAY = 1.0
+# number of frames waiting for the end of their execution or for the
+# delivery of their outputs
+NB_PENDING_FRAME = 64
+
+STAGE_QUEUE = "capture_to_start"
+STAGE_CHAIN = "start_to_end"
+STAGE_DELIVERY = "end_to_delivery"
+LST_STAGE = [STAGE_QUEUE, STAGE_CHAIN, STAGE_DELIVERY]
+
+
+class Histogram(object):
+
+    """Count of the values in buckets growing with the value, like an HDR
+    histogram. The memory doesn't change with the number of values, the
+    percentiles have a relative error under 1/2^(SUB_BUCKET_BITS - 1).
+    The values are positive integers until max_value.
+    """
+
+    def __init__(self, max_value=MAX_LATENCY, sub_bucket_bits=SUB_BUCKET_BITS):
+        self.max_value = max_value
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.sub_bucket_half = self.sub_bucket_count >> 1
+        self.counts = np.zeros(self._get_index(max_value) + 1, dtype=np.int64)
+        self.clear()
+
+    def clear(self):
+        self.counts[:] = 0
+        self.nb_value = 0
+        self.total = 0
+        self.min_value = None
+        self.max_recorded = 0
+
+    def record(self, value):
+        # the values over max_value are counted in the last bucket
+        value = min(max(int(value), 0), self.max_value)
+        self.counts[self._get_index(value)] += 1
+        self.nb_value += 1
+        self.total += value
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_recorded:
+            self.max_recorded = value
+
+    def get_percentile(self, percentile):
+        # highest value of the bucket containing the percentile
+        if not self.nb_value:
+            return 0
+        rank = max(1, int(np.ceil(percentile / 100.0 * self.nb_value)))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(self._get_highest_value(index), self.max_recorded)
+
+    def get_mean(self):
+        if not self.nb_value:
+            return 0
+        return float(self.total) / self.nb_value
+
+    def _get_index(self, value):
+        if value < self.sub_bucket_count:
+            return value
+        # the sub bucket is the first bits of the value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return self.sub_bucket_count + (shift - 1) * self.sub_bucket_half + \
+            (value >> shift) - self.sub_bucket_half
+
+    def _get_highest_value(self, index):
+        if index < self.sub_bucket_count:
+            return index
+        index -= self.sub_bucket_count
+        shift = index // self.sub_bucket_half + 1
+        sub_bucket = index % self.sub_bucket_half + self.sub_bucket_half
+        return ((sub_bucket + 1) << shift) - 1
+
+
+class LatencyTracker(object):
+
+    """Histograms of the latency of the frames of an execution:
+     - capture_to_start : capture by the media to the start of the
+       filterchain, the time waiting in the queues
+     - start_to_end : execution of the filterchain
+     - end_to_delivery : end of the filterchain to the first delivery of an
+       output to the clients, 0 when it's delivered before the end. It's
+       recorded once per frame.
+    The frames without FrameInfo are ignored. The time is in second and the
+    summary in millisecond. The summary is sent to the publisher at most
+    once per PUBLISH_DELAY.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cb_publish = None
+        # send the executions to another process instead of recording them
+        self.cb_forward = None
+        self.last_publish = 0
+        self.dct_histogram = {stage: Histogram() for stage in LST_STAGE}
+        # {(media_name, seq) : [end time, first delivery time]}, None until
+        # known. The delivery can arrive before the end of the execution.
+        self.dct_frame = collections.OrderedDict()
+
+    def clear(self):
+        with self.lock:
+            for histogram in self.dct_histogram.values():
+                histogram.clear()
+            self.dct_frame.clear()
+
+    def set_publisher(self, cb_publish):
+        self.cb_publish = cb_publish
+
+    def set_forward(self, cb_forward):
+        self.cb_forward = cb_forward
+
+    def add_execution(self, frame_info, start_time, end_time):
+        if frame_info is None:
+            return
+        if self.cb_forward:
+            self.cb_forward(frame_info, start_time, end_time)
+            return
+        with self.lock:
+            self._record(STAGE_QUEUE, start_time - frame_info.timestamp)
+            self._record(STAGE_CHAIN, end_time - start_time)
+            times = self._get_frame_times(frame_info)
+            if times[0] is None:
+                times[0] = end_time
+                self._record_delivery(times)
+        self._publish()
+
+    def add_delivery(self, frame_info, delivery_time=None):
+        if frame_info is None:
+            return
+        if delivery_time is None:
+            delivery_time = time.time()
+        with self.lock:
+            times = self._get_frame_times(frame_info)
+            if times[1] is None:
+                times[1] = delivery_time
+                self._record_delivery(times)
+
+    def get_summary(self):
+        with self.lock:
+            return {stage: _get_stats(self.dct_histogram[stage])
+                    for stage in LST_STAGE}
+
+    def _record(self, stage, duration):
+        self.dct_histogram[stage].record(duration * 1000000)
+
+    def _get_frame_times(self, frame_info):
+        key = (frame_info.media_name, frame_info.seq)
+        times = self.dct_frame.get(key, None)
+        if times is None:
+            times = self.dct_frame[key] = [None, None]
+            # forget the oldest frames, without execution or output
+            while len(self.dct_frame) > NB_PENDING_FRAME:
+                self.dct_frame.popitem(last=False)
+        return times
+
+    def _record_delivery(self, times):
+        end_time, delivery_time = times
+        if end_time is None or delivery_time is None:
+            return
+        self._record(STAGE_DELIVERY, max(0, delivery_time - end_time))
+
+    def _publish(self):
+        if not self.cb_publish:
+            return
+        now = time.time()
+        if now - self.last_publish < PUBLISH_DELAY:
+            return
+        self.last_publish = now
+        self.cb_publish(self.get_summary())
+
+
+def _get_stats(histogram):
+    if not histogram.nb_value:
+        return {}
+    stats = {"p%s" % p: histogram.get_percentile(p) / 1000.0
+             for p in LST_PERCENTILE}
+    stats["nb"] = histogram.nb_value
+    stats["mean"] = histogram.get_mean() / 1000.0
+    stats["min"] = histogram.min_value / 1000.0
+    stats["max"] = histogram.max_recorded / 1000.0
+    return stats
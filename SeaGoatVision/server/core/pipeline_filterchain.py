@@ -0,0 +1,184 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Execute a filterchain as a pipeline, each group of filters is
+a stage on his own thread. The frame N+1 enter the first stage while the frame
+N is in the next stage.
+"""
+
+import threading
+import time
+import Queue
+import numpy as np
+from SeaGoatVision.server.media.frame_info import get_frame_info
+from SeaGoatVision.commons import log
+
+logger = log.get_logger(__name__)
+
+QUEUE_SIZE = 2
+# item sent to stop the stages
+STOP_STAGE = None
+
+
+class PipelineFilterChain(object):
+
+    """Proxy of a FilterChain executed by stages.
+    The stages are started on the first frame, so the proxy can be forked
+    by a ProcessFilterChain before.
+    """
+
+    def __init__(self, filterchain, nb_stage=None):
+        self.filterchain = filterchain
+        # None is a stage per filter
+        self.nb_stage = nb_stage
+        self.lst_stage = []
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.filterchain, name)
+
+    def destroy(self):
+        self._stop_stages()
+        self.filterchain.destroy()
+
+    def reinit_after_fork(self):
+        # the stages are not started before the fork
+        self.lock = threading.Lock()
+        self.filterchain.reinit_after_fork()
+
+    def execute(self, image):
+        start_time = time.time()
+        if not self.lst_stage:
+            self._start_stages()
+        frame_info = get_frame_info(image)
+        # the media reuse the image when this function return, keep a copy
+        # for the stages. The copy is read-only, so the first filter that
+        # modify the image still work on his own copy
+        # a resized image is already a read-only copy
+        scaled_image = self.filterchain.scale_image(image)
+        if scaled_image is not image:
+            image = scaled_image
+        elif isinstance(image, np.ndarray) and not image.flags.writeable:
+            image = np.copy(image)
+            image.flags.writeable = False
+        original_image = image
+        if self.filterchain.original_image_observer:
+            self.filterchain.send_image(
+                original_image, self.filterchain.original_image_observer,
+                frame_info=frame_info)
+        # block when the first stage is full, like a normal execution
+        self.lst_stage[0].put((image, original_image, start_time,
+                               {"info": frame_info}))
+        return None
+
+    def _get_lst_range_filter(self):
+        nb_filter = self.filterchain.count()
+        nb_stage = self.nb_stage
+        if not nb_stage or nb_stage > nb_filter:
+            nb_stage = nb_filter
+        lst_range = []
+        start = 0
+        for i in range(nb_stage):
+            # share the remaining filters on the first stages
+            end = start + nb_filter // nb_stage
+            if i < nb_filter % nb_stage:
+                end += 1
+            lst_range.append((start, end))
+            start = end
+        return lst_range
+
+    def _start_stages(self):
+        with self.lock:
+            if self.lst_stage:
+                return
+            next_stage = None
+            lst_stage = []
+            for start, end in reversed(self._get_lst_range_filter()):
+                stage = ThreadStage(self.filterchain, start, end, next_stage)
+                lst_stage.insert(0, stage)
+                next_stage = stage
+            for stage in lst_stage:
+                stage.start()
+            self.lst_stage = lst_stage
+            logger.info("Filterchain %s executed with %d stages." %
+                        (self.filterchain.get_name(), len(lst_stage)))
+
+    def _stop_stages(self):
+        with self.lock:
+            if not self.lst_stage:
+                return
+            # the stop item follow the frames in all stages
+            self.lst_stage[0].put(STOP_STAGE)
+            for stage in self.lst_stage:
+                stage.join()
+            self.lst_stage = []
+
+
+class ThreadStage(threading.Thread):
+
+    """Execute a group of filters, from index start to index end, and send
+    the result to the next stage.
+    """
+
+    def __init__(self, filterchain, start, end, next_stage):
+        threading.Thread.__init__(self)
+        # don't block the exit of the server
+        self.daemon = True
+        self.filterchain = filterchain
+        self.start_index = start
+        self.end_index = end
+        self.next_stage = next_stage
+        self.queue = Queue.Queue(QUEUE_SIZE)
+
+    def put(self, item):
+        self.queue.put(item)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is STOP_STAGE:
+                break
+            image, original_image, start_time, dct_frame = item
+            # a failed frame cross the next stages without execution
+            if image is not None:
+                image = self._execute(image, original_image, dct_frame)
+            if self.next_stage:
+                self.next_stage.put((image, original_image, start_time,
+                                     dct_frame))
+            else:
+                # latency of the frame, including the wait between stages
+                end_time = time.time()
+                self.filterchain.profiler.add_frame(end_time - start_time)
+                self.filterchain.latency.add_execution(
+                    dct_frame.get("info"), start_time, end_time)
+                self.filterchain.notify_end_frame(dct_frame.get("info"))
+        if self.next_stage:
+            self.next_stage.put(STOP_STAGE)
+
+    def _execute(self, image, original_image, dct_frame):
+        # read the list each frame, a filter can be reloaded
+        lst_filter = self.filterchain.get_filter()
+        lst_filter = lst_filter[self.start_index:self.end_index]
+        lst_param = self.filterchain.pin_params(lst_filter)
+        try:
+            return self.filterchain.execute_filters(
+                lst_filter, image, original_image, dct_frame)
+        finally:
+            self.filterchain.unpin_params(lst_param)
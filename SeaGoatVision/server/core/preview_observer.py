@@ -0,0 +1,89 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Reduce the images sent to an image observer
+"""
+
+import time
+import cv2
+from SeaGoatVision.server.media.frame_info import create_frame
+from SeaGoatVision.server.media.frame_info import get_frame_info
+
+
+class PreviewObserver(object):
+
+    """Resize the images and skip the images over max_fps before calling the
+    observer.
+    size is a scale, like 0.25, or a [width, height] containing the image.
+    It's equal to his observer, so the filterchain can remove it with the
+    observer.
+    """
+
+    def __init__(self, observer, size=None, max_fps=None):
+        self.observer = observer
+        self.size = size
+        self.max_fps = max_fps
+        self.last_time = 0
+
+    def __call__(self, image):
+        if self.max_fps:
+            now = time.time()
+            if now - self.last_time < 1.0 / self.max_fps:
+                return
+            self.last_time = now
+        scale = self._get_scale(image)
+        if scale < 1:
+            dsize = (max(1, int(image.shape[1] * scale)),
+                     max(1, int(image.shape[0] * scale)))
+            # keep the capture of the frame with the resized image
+            image = create_frame(
+                cv2.resize(image, dsize, interpolation=cv2.INTER_AREA),
+                get_frame_info(image))
+        self.observer(image)
+
+    def __eq__(self, other):
+        if isinstance(other, PreviewObserver):
+            other = other.observer
+        return self.observer == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.observer)
+
+    def create_preview(self, observer):
+        # same preview for another observer
+        return PreviewObserver(observer, size=self.size, max_fps=self.max_fps)
+
+    def _get_scale(self, image):
+        if not self.size:
+            return 1
+        if isinstance(self.size, (list, tuple)):
+            # never enlarge the image
+            return min(float(self.size[0]) / image.shape[1],
+                       float(self.size[1]) / image.shape[0])
+        return self.size
+
+
+def create_observer(observer, size=None, max_fps=None):
+    if not size and not max_fps:
+        return observer
+    return PreviewObserver(observer, size=size, max_fps=max_fps)
@@ -0,0 +1,385 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Execute a filterchain in a worker process.
+The images travel in shared memory, only the small messages are pickled.
+"""
+
+import signal
+import threading
+import multiprocessing
+import Queue
+import numpy as np
+from SeaGoatVision.commons.param import Param
+from SeaGoatVision.server.media import frame_info
+from SeaGoatVision.commons import keys
+from SeaGoatVision.commons import log
+from shared_ring import SharedRing
+from shared_ring import open_ring
+
+logger = log.get_logger(__name__)
+
+NB_SLOT = 4
+JOIN_TIMEOUT = 3
+
+# command from server to worker
+CMD_STOP = "stop"
+CMD_FRAME = "frame"
+CMD_PARAM = "param"
+CMD_MEDIA_PARAM = "media_param"
+CMD_IMAGE_OBSERVER = "image_observer"
+CMD_OUTPUT_OBSERVER = "output_observer"
+CMD_RELOAD = "reload"
+
+# event from worker to server
+EVENT_IMAGE = "image"
+EVENT_OUTPUT = "output"
+EVENT_PROFILE = "profile"
+EVENT_LATENCY = "latency"
+
+
+class ProcessFilterChain(object):
+
+    """Proxy of a FilterChain executed in another process.
+    The proxied filterchain stays in the server process to answer about the
+    filters and the params, the worker process is forked from it.
+    """
+
+    def __init__(self, filterchain):
+        self.filterchain = filterchain
+        self.is_worker = False
+        self.lock = threading.Lock()
+        self.in_ring = None
+        self.out_ring = None
+        # the worker sends the outputs only when an observer is active
+        self.is_output_forwarded = False
+        # {param : (callback, callback_reset)} to forward the update of params
+        self.dct_param_notify = {}
+        # {filter_name : observer} in the worker
+        self.dct_worker_image_observer = {}
+
+        self.cmd_queue = multiprocessing.Queue()
+        self.event_queue = multiprocessing.Queue()
+        # hooked before the fork, a param modified during the fork is
+        # forwarded
+        self._hook_params()
+        self.process = multiprocessing.Process(target=self._run_worker)
+        self.process.daemon = True
+        self.process.start()
+
+        self.is_listening = True
+        self.thread_listener = threading.Thread(target=self._listen_worker)
+        self.thread_listener.daemon = True
+        self.thread_listener.start()
+
+    def __getattr__(self, name):
+        return getattr(self.filterchain, name)
+
+    def destroy(self):
+        self._send_cmd(CMD_STOP)
+        self.process.join(JOIN_TIMEOUT)
+        if self.process.is_alive():
+            logger.warning(
+                "Worker of filterchain %s doesn't stop, terminate it." %
+                self.filterchain.get_name())
+            self.process.terminate()
+        self.is_listening = False
+        self.thread_listener.join()
+        for param, (cb, cb_reset) in self.dct_param_notify.items():
+            param.remove_notify(cb)
+            param.remove_notify_reset(cb_reset)
+        self.dct_param_notify = {}
+        with self.lock:
+            if self.in_ring:
+                self.in_ring.close()
+                self.in_ring = None
+        self.filterchain.destroy()
+
+    def execute(self, image):
+        if not isinstance(image, np.ndarray):
+            return None
+        with self.lock:
+            self._update_output_forward()
+            if self.in_ring is None or not self.in_ring.can_contain(image):
+                if self.in_ring:
+                    self.in_ring.close()
+                self.in_ring = SharedRing(NB_SLOT, image.nbytes)
+            slot = self.in_ring.write(image)
+            if slot is None:
+                # the worker is late, drop the frame, it's counted in the
+                # profile
+                self.filterchain.profiler.add_drop()
+                return None
+            # the capture of the frame follow the image
+            self._send_cmd(CMD_FRAME, self.in_ring.get_name(),
+                           self.in_ring.slot_size, slot, image.shape,
+                           image.dtype.str,
+                           frame_info.serialize(
+                               frame_info.get_frame_info(image)))
+        return None
+
+    def get_nb_drop(self):
+        return self.filterchain.profiler.get_nb_drop()
+
+    def set_media_param(self, dct_media_param):
+        self.filterchain.set_media_param(dct_media_param)
+        lst_param_ser = [param.serialize()
+                         for param in dct_media_param.values()]
+        self._send_cmd(CMD_MEDIA_PARAM, lst_param_ser)
+
+    def reload_filter(self, o_filter):
+        self.filterchain.reload_filter(o_filter)
+        self._hook_params()
+        self._send_cmd(CMD_RELOAD, o_filter.__class__.__name__)
+
+    def add_image_observer(self, observer, filter_name):
+        status = self.filterchain.add_image_observer(observer, filter_name)
+        if status and len(self._get_lst_image_observer(filter_name)) == 1:
+            self._send_cmd(CMD_IMAGE_OBSERVER, filter_name, True)
+        return status
+
+    def remove_image_observer(self, observer, filter_name):
+        status = self.filterchain.remove_image_observer(observer, filter_name)
+        if status and not self._get_lst_image_observer(filter_name):
+            self._send_cmd(CMD_IMAGE_OBSERVER, filter_name, False)
+        return status
+
+    def add_filter_output_observer(self, output):
+        status = self.filterchain.add_filter_output_observer(output)
+        with self.lock:
+            self._update_output_forward()
+        return status
+
+    def remove_filter_output_observer(self, output):
+        status = self.filterchain.remove_filter_output_observer(output)
+        with self.lock:
+            self._update_output_forward()
+        return status
+
+    def _update_output_forward(self):
+        # an observer can become active, like a publisher with a new
+        # subscriber, it's checked on each frame
+        is_active = self.filterchain.has_active_output_observer()
+        if is_active != self.is_output_forwarded:
+            self.is_output_forwarded = is_active
+            self._send_cmd(CMD_OUTPUT_OBSERVER, is_active)
+
+    #
+    # SERVER PROCESS  ##############################
+    #
+    def _send_cmd(self, *args):
+        if self.is_worker:
+            return
+        self.cmd_queue.put(args)
+
+    def _get_lst_image_observer(self, filter_name):
+        if filter_name == keys.get_filter_original_name():
+            return self.filterchain.original_image_observer
+        return self.filterchain.image_observers.get(filter_name, [])
+
+    def _hook_params(self):
+        # forward the params modified on the server to the worker
+        for o_filter in self.filterchain.get_filter():
+            for param in o_filter.get_params():
+                if param in self.dct_param_notify:
+                    continue
+                cb = self._cb_forward_param(o_filter.get_name(), param)
+                cb_reset = self._cb_forward_reset(cb)
+                param.add_notify(cb)
+                # reset and set_as_default notify only the reset callbacks
+                param.add_notify_reset(cb_reset)
+                self.dct_param_notify[param] = (cb, cb_reset)
+
+    def _cb_forward_param(self, filter_name, param):
+        def forward_param(value):
+            self._send_cmd(CMD_PARAM, filter_name, param.get_name(), value,
+                           param.thres_h)
+        return forward_param
+
+    def _cb_forward_reset(self, forward_param):
+        def forward_reset(param_name, value):
+            forward_param(value)
+        return forward_reset
+
+    def _listen_worker(self):
+        ring = None
+        while self.is_listening:
+            try:
+                event = self.event_queue.get(timeout=1)
+            except Queue.Empty:
+                continue
+            try:
+                if event[0] == EVENT_IMAGE:
+                    ring = self._dispatch_image(ring, *event[1:])
+                elif event[0] == EVENT_OUTPUT:
+                    info = frame_info.deserialize(event[2])
+                    for output in self.filterchain.get_filter_output_observers():
+                        output(event[1], info)
+                elif event[0] == EVENT_PROFILE:
+                    self.filterchain.profiler.set_summary(event[1])
+                elif event[0] == EVENT_LATENCY:
+                    # sent at the end of each frame, after his outputs
+                    info = frame_info.deserialize(event[1])
+                    self.filterchain.latency.add_execution(info, *event[2:])
+                    self.filterchain.notify_end_frame(info)
+            except Exception as e:
+                log.printerror_stacktrace(logger, e, check_duplicate=True)
+        if ring:
+            ring.close()
+
+    def _dispatch_image(self, ring, filter_name, name, slot_size, slot, shape,
+                        dtype, info=None):
+        ring = open_ring(ring, name, NB_SLOT, slot_size)
+        if ring is None:
+            return None
+        image = frame_info.create_frame(ring.read(slot, shape, dtype),
+                                        frame_info.deserialize(info))
+        image.flags.writeable = False
+        try:
+            for observer in self._get_lst_image_observer(filter_name)[:]:
+                observer(image)
+        finally:
+            ring.release(slot)
+        return ring
+
+    #
+    # WORKER PROCESS  ##############################
+    #
+    def _run_worker(self):
+        # the server process manage the interruption
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        self.is_worker = True
+        filterchain = self.filterchain
+        # only this thread is forked, the locks held by the other threads of
+        # the server are never released here. The sockets of the server,
+        # like the zmq context, are not used by the worker.
+        log.reinit_after_fork()
+        self.lock = threading.Lock()
+        filterchain.reinit_after_fork()
+        # the observers of the server process are not reachable from here
+        filterchain.image_observers.clear()
+        del filterchain.original_image_observer[:]
+        for output in filterchain.get_filter_output_observers()[:]:
+            filterchain.remove_filter_output_observer(output)
+        # the summary of the profiler is published by the server process
+        filterchain.set_profile_publisher(self._send_profile)
+        # the deliveries are known by the server process, it keeps the
+        # latency of the frames
+        filterchain.latency.set_forward(self._send_latency)
+
+        ring = None
+        while True:
+            cmd = self.cmd_queue.get()
+            try:
+                if cmd[0] == CMD_STOP:
+                    break
+                elif cmd[0] == CMD_FRAME:
+                    ring = self._execute_frame(ring, *cmd[1:])
+                elif cmd[0] == CMD_PARAM:
+                    self._update_param(*cmd[1:])
+                elif cmd[0] == CMD_MEDIA_PARAM:
+                    dct_media_param = {}
+                    for param_ser in cmd[1]:
+                        param = Param(None, None, serialize=param_ser)
+                        dct_media_param[param.get_name()] = param
+                    filterchain.set_media_param(dct_media_param)
+                elif cmd[0] == CMD_IMAGE_OBSERVER:
+                    self._set_worker_image_observer(*cmd[1:])
+                elif cmd[0] == CMD_OUTPUT_OBSERVER:
+                    if cmd[1]:
+                        filterchain.add_filter_output_observer(
+                            self._send_output)
+                    else:
+                        filterchain.remove_filter_output_observer(
+                            self._send_output)
+                elif cmd[0] == CMD_RELOAD:
+                    o_filter = filterchain.resource.reload_filter(cmd[1])
+                    if o_filter:
+                        filterchain.reload_filter(o_filter)
+            except Exception as e:
+                log.printerror_stacktrace(logger, e, check_duplicate=True)
+
+        filterchain.destroy()
+        if ring:
+            ring.close()
+        if self.out_ring:
+            self.out_ring.close()
+
+    def _execute_frame(self, ring, name, slot_size, slot, shape, dtype,
+                       info=None):
+        ring = open_ring(ring, name, NB_SLOT, slot_size)
+        if ring is None:
+            return None
+        image = frame_info.create_frame(ring.read(slot, shape, dtype),
+                                        frame_info.deserialize(info))
+        image.flags.writeable = False
+        try:
+            self.filterchain.execute(image)
+        finally:
+            ring.release(slot)
+        return ring
+
+    def _update_param(self, filter_name, param_name, value, thres_h):
+        o_filter = self.filterchain.get_filter(name=filter_name)
+        if not o_filter:
+            return
+        param = o_filter.get_params(param_name=param_name)
+        if not param:
+            return
+        param.set(value, thres_h=thres_h)
+        o_filter.configure()
+
+    def _set_worker_image_observer(self, filter_name, is_active):
+        observer = self.dct_worker_image_observer.get(filter_name, None)
+        if is_active and observer is None:
+            observer = self._cb_send_image(filter_name)
+            self.dct_worker_image_observer[filter_name] = observer
+            self.filterchain.add_image_observer(observer, filter_name)
+        elif not is_active and observer is not None:
+            del self.dct_worker_image_observer[filter_name]
+            self.filterchain.remove_image_observer(observer, filter_name)
+
+    def _cb_send_image(self, filter_name):
+        def send_image(image):
+            if self.out_ring is None or not self.out_ring.can_contain(image):
+                if self.out_ring:
+                    self.out_ring.close()
+                self.out_ring = SharedRing(NB_SLOT, image.nbytes)
+            slot = self.out_ring.write(image)
+            if slot is None:
+                # the server is late, skip this preview
+                return
+            self.event_queue.put((EVENT_IMAGE, filter_name,
+                                  self.out_ring.get_name(),
+                                  self.out_ring.slot_size, slot, image.shape,
+                                  image.dtype.str,
+                                  frame_info.serialize(
+                                      frame_info.get_frame_info(image))))
+        return send_image
+
+    def _send_output(self, data, info=None):
+        self.event_queue.put((EVENT_OUTPUT, data, frame_info.serialize(info)))
+
+    def _send_profile(self, summary):
+        self.event_queue.put((EVENT_PROFILE, summary))
+
+    def _send_latency(self, info, start_time, end_time):
+        self.event_queue.put((EVENT_LATENCY, frame_info.serialize(info),
+                              start_time, end_time))
@@ -0,0 +1,153 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Latency of the filters of a filterchain, summarized by
+percentiles
+"""
+
+# the server.core package contains a module named resource
+from __future__ import absolute_import
+import collections
+import resource
+import sys
+import threading
+import time
+import numpy as np
+from SeaGoatVision.commons import log
+
+logger = log.get_logger(__name__)
+
+# number of frames kept to compute the percentiles
+NB_SAMPLE = 300
+PUBLISH_DELAY = 1.0
+LST_PERCENTILE = [50, 95, 99]
+
+# cpu time of the current thread, the stages of a pipeline run on many threads.
+# The resolution is the tick of the kernel, look at the mean of short filters
+RUSAGE_THREAD = getattr(resource, "RUSAGE_THREAD",
+                        1 if sys.platform.startswith("linux") else None)
+
+
+def get_cpu_time():
+    if RUSAGE_THREAD is None:
+        return time.clock()
+    usage = resource.getrusage(RUSAGE_THREAD)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Profiler(object):
+
+    """Keep the last samples of each filter: wall time, cpu time and size of
+    the output. The time is in millisecond and the size in byte.
+    nb_drop is the number of frames dropped by the filterchain, like when
+    his worker process is late.
+    The summary is sent to the publisher at most once per PUBLISH_DELAY.
+    """
+
+    def __init__(self, nb_sample=NB_SAMPLE):
+        self.nb_sample = nb_sample
+        self.lock = threading.Lock()
+        self.cb_publish = None
+        self.last_publish = 0
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # {filter_name : deque of (wall, cpu, size)}
+            self.dct_sample = {}
+            # keep the order of the filters
+            self.lst_filter_name = []
+            self.frame_sample = collections.deque(maxlen=self.nb_sample)
+            self.nb_frame = 0
+            self.nb_drop = 0
+            # summary received from a worker process
+            self.remote_summary = None
+
+    def set_publisher(self, cb_publish):
+        self.cb_publish = cb_publish
+
+    def add_sample(self, filter_name, wall_time, cpu_time, size):
+        with self.lock:
+            lst_sample = self.dct_sample.get(filter_name, None)
+            if lst_sample is None:
+                lst_sample = collections.deque(maxlen=self.nb_sample)
+                self.dct_sample[filter_name] = lst_sample
+                self.lst_filter_name.append(filter_name)
+            lst_sample.append((wall_time * 1000, cpu_time * 1000, size))
+
+    def add_frame(self, wall_time):
+        with self.lock:
+            self.frame_sample.append(wall_time * 1000)
+            self.nb_frame += 1
+        self._publish()
+
+    def add_drop(self, nb_frame=1):
+        with self.lock:
+            self.nb_drop += nb_frame
+        self._publish()
+
+    def get_nb_drop(self):
+        return self.nb_drop
+
+    def set_summary(self, summary):
+        # the filterchain is executed in another process
+        with self.lock:
+            self.remote_summary = summary
+        self.last_publish = 0
+        self._publish()
+
+    def get_summary(self):
+        with self.lock:
+            if self.remote_summary is not None:
+                # the drops are known by this process
+                summary = dict(self.remote_summary)
+                summary["nb_drop"] = self.nb_drop
+                return summary
+            lst_filter = []
+            for filter_name in self.lst_filter_name:
+                samples = np.array(self.dct_sample[filter_name])
+                lst_filter.append({"name": filter_name,
+                                   "wall": _get_stats(samples[:, 0]),
+                                   "cpu": _get_stats(samples[:, 1]),
+                                   "size": _get_stats(samples[:, 2])})
+            return {"nb_frame": self.nb_frame,
+                    "nb_drop": self.nb_drop,
+                    "frame": _get_stats(np.array(self.frame_sample)),
+                    "filters": lst_filter}
+
+    def _publish(self):
+        if not self.cb_publish:
+            return
+        now = time.time()
+        if now - self.last_publish < PUBLISH_DELAY:
+            return
+        self.last_publish = now
+        self.cb_publish(self.get_summary())
+
+
+def _get_stats(samples):
+    if not len(samples):
+        return {}
+    stats = {"p%d" % p: float(value)
+             for p, value in zip(LST_PERCENTILE,
+                                 np.percentile(samples, LST_PERCENTILE))}
+    stats["mean"] = float(np.mean(samples))
+    stats["max"] = float(np.max(samples))
+    return stats
@@ -21,8 +21,10 @@
 Description : ZeroMQ publisher implementation
 """
 
+import threading
 import zmq
 from SeaGoatVision.commons import keys
+from SeaGoatVision.commons import transport
 from SeaGoatVision.commons import log
 
 logger = log.get_logger(__name__)
@@ -37,6 +39,10 @@ class Publisher():
         self.dct_global_key = keys.get_lst_key_topic_pubsub()
         self.port = port
         self.socket = None
+        # the frames of a message cannot be mixed between the threads
+        self.lock = threading.Lock()
+        # {subscribed prefix : True}, informed by the XPUB socket
+        self.dct_subscription = {}
         # start topic at 100, reserve the first for global
         self.new_topic_no = 100
 
@@ -65,15 +71,72 @@ class Publisher():
             return 0
         return topic
 
-    def publish(self, key, data):
+    def has_subscriber(self, key):
+        # with a PUB socket, the subscriptions are unknown
         if not self.socket:
             return False
+        if not hasattr(zmq, "XPUB"):
+            return True
+        topic = self.dct_key_topic.get(key, None)
+        if not topic:
+            return False
+        with self.lock:
+            self._update_subscription()
+            topic = transport.encode_topic(topic)
+            for prefix in self.dct_subscription.keys():
+                if topic.startswith(prefix):
+                    return True
+        return False
+
+    def _update_subscription(self):
+        # the XPUB socket receive one message per new prefix, first byte 1,
+        # and one when the last subscriber of the prefix leave, first byte 0
+        while self.socket:
+            try:
+                msg = self.socket.recv(zmq.NOBLOCK)
+            except zmq.ZMQError:
+                return
+            if not msg:
+                continue
+            if msg[0] == "\x01":
+                self.dct_subscription[msg[1:]] = True
+            elif msg[1:] in self.dct_subscription:
+                del self.dct_subscription[msg[1:]]
+
+    def publish(self, key, data):
         # logger.debug("Send to key %s data %s." % (key, data))
+        # called by the threads of the media and the filterchains, an
+        # error is logged without stopping them
+        try:
+            header, payload = transport.encode_json(data)
+        except (TypeError, ValueError) as e:
+            log.print_function(logger.error,
+                               "Cannot publish on key %s: %s" % (key, e))
+            return False
+        return self._send(key, header, payload)
+
+    def publish_image(self, key, header, payload):
+        # header and payload come from transport.encode_image
+        return self._send(key, header, payload)
+
+    def publish_record(self, key, lst_record, frame=None):
+        # records of the outputs of a frame, see record
+        header, payload = transport.encode_record(lst_record, frame)
+        return self._send(key, header, payload)
+
+    def _send(self, key, header, payload):
+        if not self.socket:
+            return False
         topic = self.dct_key_topic.get(key, None)
         if not topic:
             logger.warning("Key not exist : %s" % key)
             return False
-        self.socket.send_pyobj((topic, data))
+        lst_frame = [transport.encode_topic(topic),
+                     transport.serialize_header(header), payload]
+        with self.lock:
+            if not self.socket:
+                return False
+            self.socket.send_multipart(lst_frame, copy=False)
         return True
 
     def start(self):
@@ -81,17 +144,26 @@ class Publisher():
             return False
         logger.info("Publisher on port %d is ready." % self.port)
         # Ignore the zmq.PUB error in Eclipse.
-        self.socket = self.context.socket(zmq.PUB)
+        # the XPUB socket inform about the subscriptions, to skip the work
+        # when nobody listen
+        self.socket = self.context.socket(getattr(zmq, "XPUB", zmq.PUB))
         self.socket.bind("tcp://*:%s" % self.port)
         return True
 
     def stop(self):
         if not self.socket:
             return False
-        self.socket.close()
-        self.socket = None
+        with self.lock:
+            self.socket.close()
+            self.socket = None
+            self.dct_subscription = {}
         return True
 
+    def create_record_observer(self, key, scale=1.0):
+        # output observer of a filterchain publishing on key, scale is the
+        # scale of his execution
+        return RecordObserver(self, key, scale)
+
     def get_callback_publish(self, key):
         # get a callback with the same key
         # caution, always use self.publish to use validation
@@ -100,3 +172,28 @@ class Publisher():
         def cb_publish(data):
             publish(key, data)
         return cb_publish
+
+
+class RecordObserver(object):
+
+    """Publish the outputs of a filterchain as records, see record.
+    It's active only when the key has a subscriber, nothing is encoded
+    when nobody listen.
+    """
+
+    def __init__(self, publisher, key, scale=1.0):
+        self.publisher = publisher
+        self.key = key
+        self.scale = scale
+
+    def __call__(self, data, frame_info=None):
+        if not self.is_active():
+            return
+        frame = None
+        if frame_info is not None:
+            frame = frame_info.serialize()
+            frame["scale"] = self.scale
+        self.publisher.publish_record(self.key, [data], frame)
+
+    def is_active(self):
+        return self.publisher.has_subscriber(self.key)
@@ -20,17 +20,24 @@
 """
 Description : Manage the resource of the server: filters and media
 """
+import importlib
 import inspect
+import os
+import threading
 
 from configuration import Configuration
 from SeaGoatVision.commons import keys
 from SeaGoatVision.server.core import filterchain
 from SeaGoatVision.server import media
 from filter import Filter
+from filter_index import FilterIndex
 from SeaGoatVision.commons import log
 
 logger = log.get_logger(__name__)
 
+# maximum wait of a media in probe, a camera can retry his opening
+PROBE_TIMEOUT = 5.0
+
 
 class Resource(object):
     # TODO the ressource.py need to manage execution access
@@ -41,8 +48,20 @@ class Resource(object):
         if not cls._instance:
             # first instance
             cls.config = Configuration()
+            cls.filter_index = None
+            # {"filter_name" : class_filter}, the imported filters
             cls.dct_filter = {}
+            # packages with their c++ filters imported
+            cls.set_cpp_package = set()
+            # {"media_name" : media}, the available media
             cls.dct_media = {}
+            # {"media_name" : state}, the state of the configured media
+            cls.dct_media_state = {}
+            # {"media_name" : event set after the probe}
+            cls.dct_media_probe = {}
+            cls.media_lock = threading.RLock()
+            cls.is_media_loaded = False
+            cls.publisher = None
 
             # {"filter_name" : class_filter}
             cls.dct_filterchain = {}
@@ -52,10 +71,8 @@ class Resource(object):
         return cls._instance
 
     def __init__(self):
-        if not self.dct_filter:
+        if self.filter_index is None:
             self._load_filters()
-        if not self.dct_media:
-            self.load_media()
 
     # Utils
     def _module_name(self, name):
@@ -169,26 +186,58 @@ class Resource(object):
     # Filter
     def get_filter_info_list(self):
         dct_info = {}
-        for name in self.dct_filter.keys():
-            doc = self.dct_filter[name].__doc__
+        for name in self.filter_index.get_lst_filter_name():
+            doc = self.filter_index.get_filter_info(name)["doc"]
             if doc is None:
                 doc = ""
             dct_info[name] = doc
         return dct_info
 
     def _load_filters(self):
-        # TODO : redo an import
-        # TODO "class" key is important?
-        # update list of filter
+        # the filters are found from their source code, and imported when a
+        # filterchain use them
         import filters
-        self.dct_filter = {name: filtre
-                           for name, filtre in vars(filters).items()
-                           if inspect.isclass(filtre)
-                           if issubclass(filtre, Filter)
-                           if "execute" in vars(filtre)}
+        directory = os.path.dirname(filters.__file__)
+        lst_package = []
+        if self.config.get_is_show_public_filter():
+            lst_package.append(("filters.public",
+                                os.path.join(directory, "public")))
+        if self.config.get_is_show_private_filter():
+            lst_package.append(("filters.private",
+                                os.path.join(directory, "private")))
+        filter_index = FilterIndex()
+        filter_index.load(lst_package)
+        self.filter_index = filter_index
+        self.dct_filter = {}
+
+    def _import_filter(self, filter_name):
+        info = self.filter_index.get_filter_info(filter_name)
+        if not info:
+            return None
+        try:
+            module = importlib.import_module(info["module"])
+            if info["cpp"] and info["module"] not in self.set_cpp_package:
+                # a package import all his c++ filters at the same time
+                if hasattr(module, "import_cpp_filter"):
+                    module.import_cpp_filter()
+                self.set_cpp_package.add(info["module"])
+            filter_class = getattr(module, filter_name, None)
+        except Exception as e:
+            log.printerror_stacktrace(
+                logger, "Import filter %s: %s" % (filter_name, e))
+            return None
+        if not inspect.isclass(filter_class) or \
+                not issubclass(filter_class, Filter):
+            log.print_function(
+                logger.error,
+                "The filter %s is not found in module %s." %
+                (filter_name, info["module"]))
+            return None
+        self.dct_filter[filter_name] = filter_class
+        return filter_class
 
     def reload_filter(self, filter_name):
-        o_filter = self.dct_filter.get(filter_name, None)
+        o_filter = self.get_filter_from_filter_name(filter_name)
         if not o_filter:
             log.print_function(
                 logger.error,
@@ -201,6 +250,8 @@ class Resource(object):
         else:
             module = self._module_name(o_filter.__module__)
         reload(module)
+        if hasattr(module, "import_cpp_filter"):
+            module.import_cpp_filter()
         filter_class = getattr(module, filter_name)
         o_filter = filter_class()
         o_filter.set_name(filter_name)
@@ -216,30 +267,17 @@ class Resource(object):
         return o_filter
 
     def get_filter_from_filter_name(self, filter_name):
-        return self.dct_filter.get(filter_name, None)
+        filter_class = self.dct_filter.get(filter_name, None)
+        if filter_class:
+            return filter_class
+        return self._import_filter(filter_name)
 
     # Media
     def load_media(self):
         # update list of media
+        # The configured media are probed in parallel in background, a
+        # camera can take seconds to open. get_media wait the end of the probe.
         dct_media = {}
-        # Create personalize media
-        for conf_media in self.config.get_lst_media_config():
-            name = conf_media.name
-            o_media = conf_media.media(conf_media)
-            if o_media.is_opened():
-                if name in dct_media.keys():
-                    log.print_function(
-                        logger.error,
-                        "Media %s already exist." %
-                        name)
-                    continue
-                dct_media[name] = o_media
-                logger.info("Media %s detected." % name)
-            else:
-                log.print_function(
-                    logger.error,
-                    "Camera %s not detected" %
-                    name)
         # Force media_video
         media_video = media.media_video.MediaVideo(
             keys.get_media_file_video_name())
@@ -252,14 +290,97 @@ class Resource(object):
         dct_media[keys.get_media_empty_name()] = Empty(
             keys.get_media_empty_name())
 
-        self.dct_media = dct_media
+        with self.media_lock:
+            self.dct_media = dct_media
+            self.is_media_loaded = True
+            lst_conf_media = []
+            # Create personalize media
+            for conf_media in self.config.get_lst_media_config():
+                name = conf_media.name
+                if name in self.dct_media_probe or name in dct_media:
+                    log.print_function(
+                        logger.error,
+                        "Media %s already exist." %
+                        name)
+                    continue
+                self.dct_media_probe[name] = threading.Event()
+                self.dct_media_state[name] = keys.get_key_media_state_probing()
+                lst_conf_media.append(conf_media)
+
+        for conf_media in lst_conf_media:
+            thread = threading.Thread(target=self._probe_media,
+                                      args=(conf_media,))
+            thread.daemon = True
+            thread.start()
+
+    def _probe_media(self, conf_media):
+        name = conf_media.name
+        o_media = None
+        try:
+            o_media = conf_media.media(conf_media)
+        except Exception as e:
+            log.printerror_stacktrace(
+                logger, "Probe media %s: %s" % (name, e))
+        if o_media is not None and o_media.is_opened():
+            state = keys.get_key_media_state_available()
+            logger.info("Media %s detected." % name)
+        else:
+            o_media = None
+            state = keys.get_key_media_state_unavailable()
+            log.print_function(
+                logger.error,
+                "Camera %s not detected" %
+                name)
+
+        with self.media_lock:
+            if o_media is not None:
+                if self.publisher:
+                    o_media.set_publisher(self.publisher)
+                self.dct_media[name] = o_media
+            self.dct_media_state[name] = state
+            publisher = self.publisher
+        self.dct_media_probe[name].set()
+        if publisher:
+            publisher.publish(keys.get_key_media_state(),
+                              {"media": name, "state": state})
 
     def get_media_name_list(self):
-        return self.dct_media.keys()
-
-    def get_media(self, name):
-        return self.dct_media.get(name, None)
+        # don't wait the media in probe
+        with self.media_lock:
+            return self._get_dct_media().keys()
+
+    def get_media_state(self):
+        with self.media_lock:
+            self._get_dct_media()
+            return dict(self.dct_media_state)
+
+    def get_media(self, name, timeout=PROBE_TIMEOUT):
+        # None when the media doesn't exist or is still in probe after
+        # timeout, get_media_state tells the difference
+        with self.media_lock:
+            o_media = self._get_dct_media().get(name, None)
+            probe = self.dct_media_probe.get(name, None)
+        if o_media is not None or probe is None:
+            return o_media
+        # first access of a media in probe
+        if not probe.wait(timeout):
+            log.print_function(
+                logger.warning, "Media %s is still in probe after %s sec." %
+                (name, timeout))
+            return None
+        with self.media_lock:
+            return self.dct_media.get(name, None)
 
     def set_all_publisher(self, publisher):
-        for media in self.dct_media.values():
-            media.set_publisher(publisher)
+        with self.media_lock:
+            self.publisher = publisher
+            for media in self._get_dct_media().values():
+                media.set_publisher(publisher)
+
+    def _get_dct_media(self):
+        # the media are opened on the first access, a filterchain can be
+        # executed without camera
+        # call it with the media_lock
+        if not self.is_media_loaded:
+            self.load_media()
+        return self.dct_media
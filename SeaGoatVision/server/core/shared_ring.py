@@ -0,0 +1,107 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Ring of images in shared memory between two processes
+"""
+
+import os
+import mmap
+import tempfile
+import numpy as np
+from SeaGoatVision.commons import log
+
+logger = log.get_logger(__name__)
+
+SHM_DIR = "/dev/shm"
+
+
+class SharedRing(object):
+
+    """Images written by one process and read by another one, without copy
+    on the reader side.
+    The first bytes of the file are the state of each slot: 0 when the slot
+    is free, 1 when the slot contains an image not released by the reader.
+    Only one process write and only one process read a ring.
+    """
+
+    def __init__(self, nb_slot, slot_size, name=None):
+        self.nb_slot = nb_slot
+        self.slot_size = slot_size
+        self.next_slot = 0
+        # the owner create the file and remove it when closing
+        self.is_owner = name is None
+        size = nb_slot + nb_slot * slot_size
+        if self.is_owner:
+            shm_dir = SHM_DIR if os.path.isdir(SHM_DIR) else None
+            fd, name = tempfile.mkstemp(prefix="seagoat_", dir=shm_dir)
+            os.ftruncate(fd, size)
+        else:
+            fd = os.open(name, os.O_RDWR)
+        self.name = name
+        self.mmap = mmap.mmap(fd, size)
+        os.close(fd)
+        self.state = np.ndarray((nb_slot,), dtype=np.uint8, buffer=self.mmap)
+
+    def get_name(self):
+        return self.name
+
+    def can_contain(self, image):
+        return image.nbytes <= self.slot_size
+
+    def write(self, image):
+        # return the slot number, or None if the reader is late
+        slot = self.next_slot
+        if self.state[slot]:
+            return None
+        data = self.read(slot, image.shape, image.dtype)
+        data[...] = image
+        self.state[slot] = 1
+        self.next_slot = (slot + 1) % self.nb_slot
+        return slot
+
+    def read(self, slot, shape, dtype):
+        offset = self.nb_slot + slot * self.slot_size
+        return np.ndarray(shape, dtype=dtype, buffer=self.mmap, offset=offset)
+
+    def release(self, slot):
+        self.state[slot] = 0
+
+    def close(self):
+        self.state = None
+        self.mmap.close()
+        if self.is_owner:
+            try:
+                os.remove(self.name)
+            except OSError:
+                logger.warning("Shared ring %s already removed." % self.name)
+
+
+def open_ring(ring, name, nb_slot, slot_size):
+    # return the reader ring associated to the name, reopen it if it changes
+    if ring is not None:
+        if ring.get_name() == name:
+            return ring
+        ring.close()
+    try:
+        return SharedRing(nb_slot, slot_size, name=name)
+    except (OSError, IOError) as e:
+        log.print_function(
+            logger.error, "Cannot open shared ring %s: %s" % (name, e))
+    return None
@@ -17,8 +17,15 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import distutils.sysconfig
+import hashlib
+import multiprocessing
 import os
+import re
+import subprocess
+import sys
 import time
+import traceback
 
 from SeaGoatVision.commons import log
 from SeaGoatVision.server.core.filter import Filter
@@ -26,6 +33,8 @@ from SeaGoatVision.server.core.configuration import Configuration
 from cpp_code import *
 import numpy as np
 from python_code import *
+import scipy
+import scipy.weave as weave
 import scipy.weave.ext_tools as ext_tools
 
 
@@ -33,23 +42,31 @@ import scipy.weave.ext_tools as ext_tools
 logger = log.get_logger(__name__)
 
 BUILD_DIR = 'build'
-RELOAD_DIR = os.path.join('build', 'reload')
-has_configure = False
-has_destroy = False
+# compiled modules, named by the hash of their code, kept between executions
+CACHE_DIR = os.path.join('build', 'cache')
+# the headers of the filter directory, the others are in the versions
+CPP_INCLUDE = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
 config = Configuration()
+# versions of the compiler and the libraries, see _get_toolchain_version
+_toolchain_version = None
 
 
 def import_all_cpp_filter(
-        cppfiles, cpptimestamps, module, file, extra_link_arg=[], extra_compile_arg=[]):
+        cppfiles, module, file, extra_link_arg=[], extra_compile_arg=[]):
     """
     This method finds and compile every c++ filters
-    If a c++ file changed, the file must be recompiled in a new .so file
+    The .so file is named by the hash of the c++ code, his headers and the
+    versions of the compiler and the libraries, an unchanged filter is
+    imported from the cache without compilation and a changed filter is
+    compiled in a new .so file
+    The filters to compile are compiled in parallel, a process by core
     """
     # param :
     # module like sys.modules[__name__]
     # file is __file__ from __init__.py
-    _create_build(cppfiles)
+    _create_build()
 
+    lst_filter = []
     dirname = os.path.dirname(file)
     for f in os.listdir(dirname):
         if not f.endswith(".cpp"):
@@ -65,73 +82,199 @@ def import_all_cpp_filter(
                 (filename, code))
             continue
 
-        # Verify if there are changes in the c++ code file.  If there are
-        # changes, add a timestamp to the filter .so file name to force a
-        # reimportation of the new filter.
-        if filename in cppfiles:
-            if cppcode != cppfiles[filename]:
-                cpptimestamps[filename] = str(int(time.time()))
+        modname = _get_modname(filename, cppcode,
+                               _read_headers(dirname, cppcode),
+                               extra_link_arg, extra_compile_arg)
+        if filename not in cppfiles:
+            # first import of this filter, remove the old versions
+            _clean_cache(filename, modname)
         cppfiles[filename] = cppcode
+        lst_filter.append((filename, modname, cppcode))
 
-        if filename in cpptimestamps:
-            modname = filename + cpptimestamps[filename]
+    lst_compile = []
+    for filename, modname, cppcode in lst_filter:
+        if _is_cached(modname):
+            logger.info("Load %s from the cache.", filename)
         else:
-            modname = filename
+            lst_compile.append((filename, modname, cppcode, extra_link_arg,
+                                extra_compile_arg))
+    lst_error = _compile_all(lst_compile)
 
-        mod = _compile_cpp(modname, cppcode, extra_link_arg, extra_compile_arg)
+    # the import and the creation of the class stay in this process
+    for filename, modname, _ in lst_filter:
+        if filename in lst_error:
+            continue
+        _create_module(module, filename, modname)
 
-        _create_python_code(mod, filename, cppcode)
 
-        _create_module(cpptimestamps, module, filename, mod)
+def _compile_all(lst_compile):
+    # return the names of the filters not compiled
+    if not lst_compile:
+        return []
+    if len(lst_compile) == 1:
+        lst_result = [_build_module(*lst_compile[0])]
+    else:
+        nb_process = min(multiprocessing.cpu_count(), len(lst_compile))
+        logger.info("Compile %d filters with %d processes.",
+                    len(lst_compile), nb_process)
+        pool = multiprocessing.Pool(nb_process)
+        try:
+            lst_result = pool.map(_build_module_args, lst_compile)
+        finally:
+            pool.close()
+            pool.join()
+
+    lst_error = []
+    for filename, duration, error in lst_result:
+        if error:
+            log.print_function(logger.error, "Compile %s: %s" %
+                               (filename, error))
+            lst_error.append(filename)
+        else:
+            logger.info("Compiled %s in %.1f sec.", filename, duration)
+    return lst_error
 
 
-def _create_build(cppfiles):
-    if not os.path.exists(BUILD_DIR):
-        os.mkdir(BUILD_DIR)
-    if not os.path.exists(RELOAD_DIR):
-        os.mkdir(RELOAD_DIR)
-    if not cppfiles:
-        for f in os.listdir(RELOAD_DIR):
-            os.remove(os.path.join(RELOAD_DIR, f))
+def _build_module_args(args):
+    return _build_module(*args)
 
 
-def _create_module(cpptimestamps, module, modname, mod):
+def _build_module(filename, modname, cppcode, extra_link_arg,
+                  extra_compile_arg):
+    # executed in a process of the pool, return (filename, duration, error)
+    start_time = time.time()
     try:
-        logger.info("Begin compile %s.", modname)
+        logger.info("Begin compile %s.", filename)
+        mod = _compile_cpp(modname, cppcode, extra_link_arg,
+                           extra_compile_arg)
+        _create_python_code(mod, filename, cppcode)
         no_verbose = 3 if config.get_verbose() else 0
-        if modname in cpptimestamps:
-            # Reloaded modules are saved in the reload folder for easy cleanup
-            mod.compile(RELOAD_DIR, verbose=no_verbose)
-        else:
-            mod.compile(BUILD_DIR, verbose=no_verbose)
+        mod.compile(CACHE_DIR, verbose=no_verbose)
+    except Exception:
+        # the exception of weave cannot always be pickled
+        return filename, time.time() - start_time, traceback.format_exc()
+    return filename, time.time() - start_time, None
 
+
+def _create_build():
+    if not os.path.exists(BUILD_DIR):
+        os.mkdir(BUILD_DIR)
+    if not os.path.exists(CACHE_DIR):
+        os.mkdir(CACHE_DIR)
+    if CACHE_DIR not in sys.path:
+        sys.path.insert(0, CACHE_DIR)
+
+
+def _get_modname(filename, cppcode, lst_header, lst_extra_link,
+                 lst_extra_compile):
+    # the generated code, the headers, the toolchain and the arguments
+    # change the .so file too
+    sha = hashlib.sha1()
+    for code in [cppcode, init_code(True), init_code(False), destroy_code(),
+                 execute_code(), set_original_image_code(),
+                 set_global_params_code(), params_code(), notify_code(),
+                 help_code(), config_code(), _get_toolchain_version()] + \
+            lst_header:
+        sha.update(code)
+        sha.update("\0")
+    sha.update(" ".join(lst_extra_link))
+    sha.update("\0")
+    sha.update(" ".join(lst_extra_compile))
+    return "%s_%s" % (filename, sha.hexdigest()[:16])
+
+
+def _read_headers(dirname, cppcode):
+    # content of the headers included with quotes, recursively, sorted by
+    # path. The missing headers are left to the compiler.
+    dct_header = {}
+    lst_code = [(dirname, cppcode)]
+    while lst_code:
+        directory, code = lst_code.pop()
+        for include in CPP_INCLUDE.findall(code):
+            path = os.path.normpath(os.path.join(directory, include))
+            if path in dct_header or not os.path.isfile(path):
+                continue
+            with open(path) as f:
+                dct_header[path] = f.read()
+            lst_code.append((os.path.dirname(path), dct_header[path]))
+    # relative path, the cache stays valid when the project is moved
+    return ["%s\0%s" % (os.path.relpath(path, dirname), dct_header[path])
+            for path in sorted(dct_header)]
+
+
+def _get_toolchain_version():
+    # a new compiler, opencv or weave needs a new .so file
+    global _toolchain_version
+    if _toolchain_version is not None:
+        return _toolchain_version
+    import cv2
+    lst_version = [cv2.__version__,
+                   getattr(weave, "__version__", scipy.__version__),
+                   np.__version__]
+    compiler = distutils.sysconfig.get_config_var("CXX") or \
+        distutils.sysconfig.get_config_var("CC") or "c++"
+    try:
+        process = subprocess.Popen(compiler.split() + ["--version"],
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        lst_version.append(process.communicate()[0])
+    except OSError as e:
+        log.print_function(logger.warning, "Version of compiler %s: %s" %
+                           (compiler, e))
+        lst_version.append(compiler)
+    _toolchain_version = "\0".join(lst_version)
+    return _toolchain_version
+
+
+def _is_cached(modname):
+    return os.path.exists(os.path.join(CACHE_DIR, modname + ".so"))
+
+
+def _clean_cache(filename, modname):
+    prefix = filename + "_"
+    for f in os.listdir(CACHE_DIR):
+        name = f.split(".", 1)[0]
+        if not name.startswith(prefix) or name == modname:
+            continue
+        # another filter can have a name starting like this one
+        if len(name) != len(modname) or name in sys.modules:
+            continue
+        try:
+            os.remove(os.path.join(CACHE_DIR, f))
+        except OSError as e:
+            log.print_function(logger.warning, "Clean cache %s: %s" % (f, e))
+
+
+def _create_module(module, filename, modname):
+    try:
         cppmodule = __import__(modname)
         params = {}
         dct_fct = {
             '__init__':
-            create_init(getattr(cppmodule, 'init_' + modname), params),
+            create_init(getattr(cppmodule, 'init_' + filename), params),
             'execute':
-            create_execute(getattr(cppmodule, 'exec_' + modname)),
+            create_execute(getattr(cppmodule, 'exec_' + filename)),
             'py_init_param': py_init_param,
             'py_init_global_param': py_init_global_param,
             'set_original_image': create_set_original_image(
-                getattr(cppmodule, 'set_original_image_' + modname)),
+                getattr(cppmodule, 'set_original_image_' + filename)),
             'set_global_params_cpp': create_set_global_params(
-                getattr(cppmodule, 'set_global_params_' + modname)),
-            '__doc__': getattr(cppmodule, 'help_' + modname)()
+                getattr(cppmodule, 'set_global_params_' + filename)),
+            '__doc__': getattr(cppmodule, 'help_' + filename)()
         }
-        if has_configure:
+        # optional functions of the c++ filter
+        if hasattr(cppmodule, 'config_' + filename):
             dct_fct['configure'] = create_configure(
-                getattr(cppmodule, 'config_' + modname))
-        if has_destroy:
+                getattr(cppmodule, 'config_' + filename))
+        if hasattr(cppmodule, 'destroy_' + filename):
             dct_fct['destroy'] = create_destroy(
-                getattr(cppmodule, 'destroy_' + modname))
+                getattr(cppmodule, 'destroy_' + filename))
 
-        clazz = type(modname,
+        clazz = type(filename,
                      (Filter,),
                      dct_fct)
         clazz.__module_init__ = module
-        setattr(module, modname, clazz)
+        setattr(module, filename, clazz)
         del clazz
     except Exception as e:
         log.printerror_stacktrace(logger, e)
@@ -166,22 +309,16 @@ def _create_python_code(mod, modname, cppcode):
 
     # configure
     if "void configure()" in cppcode:
-        has_configure = True
         func = ext_tools.ext_function('config_' + modname, config_code(), [])
         func.customize.add_support_code(params_code())
         func.customize.add_support_code(cppcode)
         func.customize.add_support_code(notify_code())
         mod.add_function(func)
-    else:
-        has_configure = False
 
     # destroy
     if "void destroy()" in cppcode:
-        has_destroy = True
         func = ext_tools.ext_function('destroy_' + modname, destroy_code(), [])
         mod.add_function(func)
-    else:
-        has_destroy = False
 
     # set original image
     func = ext_tools.ext_function(
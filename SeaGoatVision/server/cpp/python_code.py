@@ -90,4 +90,4 @@ def py_init_global_param(self, name, value, min=None, max=None):
 def py_init_param(self, name, value, min=None, max=None):
     param = Param(name, value, min_v=min, max_v=max)
     self.params[name] = param
-    setattr(self, name, param)
+    self.add_param(name, param)
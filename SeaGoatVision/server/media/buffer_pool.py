@@ -0,0 +1,102 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Ring of pre-allocated images reused by a media
+"""
+
+import threading
+import numpy as np
+from SeaGoatVision.commons import log
+
+logger = log.get_logger(__name__)
+
+
+class BufferPool(object):
+
+    """Keep a limited number of images per shape to reuse them between frames.
+    A buffer returned by get is owned by the caller, with a count of 1.
+    Every observer receiving the buffer call acquire and release, the buffer
+    come back in the pool when the count reach 0.
+    """
+
+    def __init__(self, nb_buffer=8):
+        self.nb_buffer = nb_buffer
+        self.lock = threading.Lock()
+        # {(shape, dtype) : [free buffer,]}
+        self.dct_free = {}
+        # {id(buffer) : [buffer, key, count]}
+        self.dct_used = {}
+        # number of buffer allocated per key, free and used
+        self.dct_nb_alloc = {}
+        self.nb_hit = 0
+        self.nb_miss = 0
+
+    def get(self, shape, dtype=np.uint8):
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self.lock:
+            lst_free = self.dct_free.get(key, None)
+            if lst_free:
+                self.nb_hit += 1
+                buff = lst_free.pop()
+            else:
+                self.nb_miss += 1
+                buff = np.empty(shape, dtype=dtype)
+                nb_alloc = self.dct_nb_alloc.get(key, 0)
+                if nb_alloc >= self.nb_buffer:
+                    # the ring is full, this buffer is not tracked
+                    return buff
+                self.dct_nb_alloc[key] = nb_alloc + 1
+            self.dct_used[id(buff)] = [buff, key, 1]
+        return buff
+
+    def acquire(self, buff, count=1):
+        with self.lock:
+            used = self.dct_used.get(id(buff), None)
+            if used is None or used[0] is not buff:
+                return False
+            used[2] += count
+        return True
+
+    def release(self, buff):
+        with self.lock:
+            used = self.dct_used.get(id(buff), None)
+            if used is None or used[0] is not buff:
+                return False
+            used[2] -= 1
+            if used[2] > 0:
+                return True
+            del self.dct_used[id(buff)]
+            self.dct_free.setdefault(used[1], []).append(buff)
+        return True
+
+    def clear(self):
+        # the used buffer is forgotten, the observer can continue to use it
+        with self.lock:
+            self.dct_free = {}
+            self.dct_used = {}
+            self.dct_nb_alloc = {}
+
+    def get_stats(self):
+        with self.lock:
+            nb_free = sum([len(lst) for lst in self.dct_free.values()])
+            return {"hit": self.nb_hit,
+                    "miss": self.nb_miss,
+                    "used": len(self.dct_used),
+                    "free": nb_free}
@@ -0,0 +1,84 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Description : Information about the capture of a frame, carried with the
+image from the media to the observers of the filterchain
+"""
+
+import numpy as np
+
+
+class FrameInfo(object):
+
+    """Capture of a frame by a media.
+     - timestamp : time of the capture, in seconds since the epoch
+     - seq : number of the frame in the media, a gap is a dropped frame
+     - media_name : name of the media
+    """
+    __slots__ = ("timestamp", "seq", "media_name")
+
+    def __init__(self, timestamp, seq, media_name):
+        self.timestamp = timestamp
+        self.seq = seq
+        self.media_name = media_name
+
+    def serialize(self):
+        return {"timestamp": self.timestamp,
+                "seq": self.seq,
+                "media_name": self.media_name}
+
+    def __repr__(self):
+        return "FrameInfo(%s, %s, %s)" % (self.timestamp, self.seq,
+                                          self.media_name)
+
+
+def serialize(info):
+    # a dict to send the info to another process, None without info
+    if info is None:
+        return None
+    return info.serialize()
+
+
+def deserialize(data):
+    if not data:
+        return None
+    return FrameInfo(data.get("timestamp"), data.get("seq"),
+                     data.get("media_name"))
+
+
+class Frame(np.ndarray):
+
+    """Image with the FrameInfo of his capture.
+    Only this view has the info, the images computed from it have None.
+    """
+    info = None
+
+
+def create_frame(image, info):
+    # a view of the image, without copy
+    if info is None or not isinstance(image, np.ndarray):
+        return image
+    frame = image.view(Frame)
+    frame.info = info
+    return frame
+
+
+def get_frame_info(image):
+    return getattr(image, "info", None)
@@ -391,6 +391,12 @@ class Firewire(MediaStreaming):
         self.count_not_receive = 0
         return self.actual_image
 
+    def get_capture_timestamp(self):
+        # the timestamp of the camera is in microseconds since the epoch
+        if self.actual_timestamp <= 0:
+            return None
+        return self.actual_timestamp / 1000000.0
+
     def close(self):
         # Only the manager can call this close or the reload on media.py
         MediaStreaming.close(self)
@@ -21,7 +21,6 @@ from SeaGoatVision.server.media.media_streaming import MediaStreaming
 from SeaGoatVision.server.core.configuration import Configuration
 from SeaGoatVision.commons.param import Param
 from SeaGoatVision.commons import log
-import numpy as np
 
 logger = log.get_logger(__name__)
 
@@ -48,7 +47,7 @@ class ImageGenerator(MediaStreaming):
         self.dct_params = {}
 
         default_width = 800
-        param = Param("width", default_width, min_v=1, max_v=1200)
+        param = Param("width", default_width, min_v=1, max_v=1920)
         self.dct_params["width"] = param
 
         default_height = 600
@@ -84,7 +83,8 @@ class ImageGenerator(MediaStreaming):
     def next(self):
         width = self.dct_params.get("width").get()
         height = self.dct_params.get("height").get()
-        self.image = np.zeros((height, width, 3), dtype=np.uint8)
+        self.image = self.buffer_pool.get((height, width, 3))
+        self.image.fill(0)
         return self.image
 
     def get_properties_param(self):
@@ -19,11 +19,15 @@
 
 import cv2
 from cv2 import cv
+from SeaGoatVision.server.media.buffer_pool import BufferPool
 
 
 class Movie:
 
-    def __init__(self, file_name):
+    def __init__(self, file_name, buffer_pool=None):
+        if buffer_pool is None:
+            buffer_pool = BufferPool()
+        self.buffer_pool = buffer_pool
         self.video = None
         self.isplaying = True
         self.last_image = None
@@ -82,11 +86,20 @@ class Movie:
         elif not self.isplaying:
             return self.last_image.copy()
 
-        run, self.last_image = self.video.read()
+        buff = None
+        if self.last_image is not None:
+            buff = self.buffer_pool.get(self.last_image.shape)
+            run, image = self.video.read(image=buff)
+        else:
+            run, image = self.video.read()
+        if image is not buff:
+            self.buffer_pool.release(buff)
         if not run:
+            self.buffer_pool.release(image)
             raise StopIteration
 
-        return self.last_image.copy()
+        self.last_image = image
+        return image
 
     def close(self):
         Media_video.close(self)
@@ -108,8 +108,19 @@ class Webcam(MediaStreaming):
         return MediaStreaming.open(self)
 
     def next(self):
-        run, image = self.video.read()
+        buff = None
+        if self.shape:
+            buff = self.buffer_pool.get(self.shape)
+            run, image = self.video.read(image=buff)
+        else:
+            run, image = self.video.read()
+        if image is not buff:
+            # first image or new resolution, the buffer cannot be filled
+            self.buffer_pool.release(buff)
+            if image is not None:
+                self.shape = image.shape
         if not run:
+            self.buffer_pool.release(image)
             raise StopIteration
         return image
 
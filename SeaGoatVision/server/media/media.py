@@ -18,6 +18,12 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from thread_media import ThreadMedia
+from thread_observer import ThreadObserver
+from buffer_pool import BufferPool
+from frame_info import FrameInfo
+from frame_info import create_frame
+import threading
+import time
 import numpy as np
 from SeaGoatVision.commons import log
 
@@ -29,11 +35,16 @@ class Media(object):
     def __init__(self):
         self.sleep_time = 1 / 30.0
         self.lst_observer = []
+        # {observer : ThreadObserver}
+        self.dct_thread_observer = {}
         self.thread = None
         self.media_name = None
         self.active_loop = True
         self.is_client_manager = False
         self.publisher = None
+        self.buffer_pool = BufferPool()
+        # sequence number of the next frame sent to the observers
+        self.frame_seq = 0
 
     def set_is_client_manager(self, is_client_manager):
         self.is_client_manager = is_client_manager
@@ -71,7 +82,8 @@ class Media(object):
 
     def get_info(self):
         fps = int(1 / self.sleep_time) if self.thread else -1
-        return {"fps": fps, "nb_frame": self.get_total_frames()}
+        return {"fps": fps, "nb_frame": self.get_total_frames(),
+                "buffer_pool": self.buffer_pool.get_stats()}
 
     def serialize(self):
         pass
@@ -101,6 +113,13 @@ class Media(object):
         # edit me in child
         pass
 
+    def get_capture_timestamp(self):
+        # edit me in child
+        # Return the time of the capture of the last image returned by next,
+        # in seconds since the epoch, when the device gives it. Else the
+        # time of the return of next is used.
+        return None
+
     def reset(self):
         # restore the media
         pass
@@ -114,6 +133,7 @@ class Media(object):
             return False
         self.thread.stop()
         self.thread = None
+        self.buffer_pool.clear()
         return True
 
     def initialize(self):
@@ -133,10 +153,20 @@ class Media(object):
     def change_sleep_time(self, sleep_time):
         self.sleep_time = sleep_time
 
-    def add_observer(self, observer):
+    def add_observer(self, observer, name=None, policy=None, queue_size=None):
+        # policy is the behavior when the observer is late, see ThreadObserver
+        if observer in self.dct_thread_observer:
+            logger.warning(
+                "Observer already added into media %s" %
+                (self.get_name()))
+            return
         start_media = False
         if not self.lst_observer:
             start_media = True
+        thread = ThreadObserver(observer, self.buffer_pool, name=name,
+                                policy=policy, queue_size=queue_size)
+        thread.start()
+        self.dct_thread_observer[observer] = thread
         self.lst_observer.append(observer)
         if start_media:
             self.open()
@@ -144,6 +174,10 @@ class Media(object):
     def remove_observer(self, observer):
         if observer in self.lst_observer:
             self.lst_observer.remove(observer)
+            thread = self.dct_thread_observer.pop(observer)
+            thread.stop()
+            if thread is not threading.current_thread():
+                thread.join()
         else:
             logger.warning(
                 "Observer missing into media %s" %
@@ -151,10 +185,36 @@ class Media(object):
         if not self.lst_observer:
             self.close()
 
-    def notify_observer(self, image):
-        # be sure the image is different for all observer
-        for observer in self.lst_observer:
-            observer(np.copy(image))
+    def get_nb_drop(self):
+        # {observer name : number of dropped images}
+        return {thread.get_observer_name(): thread.get_nb_drop()
+                for thread in self.dct_thread_observer.values()}
+
+    def notify_observer(self, image, timestamp=None):
+        # all observers share the same read-only image, an observer need to
+        # copy it before modifying it
+        if timestamp is None:
+            timestamp = time.time()
+        info = FrameInfo(timestamp, self.frame_seq, self.get_name())
+        self.frame_seq += 1
+        frame = self._get_shared_frame(image, info)
+        lst_thread = self.dct_thread_observer.values()
+        # the buffer come back into the pool when all observers released it
+        self.buffer_pool.acquire(image, len(lst_thread))
+        for thread in lst_thread:
+            thread.put(frame, image)
+        # release the reference taken by next
+        self.buffer_pool.release(image)
+
+    def _get_shared_frame(self, image, info=None):
+        if not isinstance(image, np.ndarray):
+            return image
+        if info is None:
+            frame = image.view()
+        else:
+            frame = create_frame(image, info)
+        frame.flags.writeable = False
+        return frame
 
     def set_loop_enable(self, enable):
         self.active_loop = enable
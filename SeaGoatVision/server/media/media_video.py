@@ -106,7 +106,7 @@ class MediaVideo(Media):
         # check if it's supported video
         video = cv2.VideoCapture(file_name)
         if video:
-            self.movie = Movie(file_name)
+            self.movie = Movie(file_name, buffer_pool=self.buffer_pool)
             return True
         return False
 
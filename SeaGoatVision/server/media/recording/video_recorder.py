@@ -22,7 +22,6 @@ import time
 from PIL import Image
 import cv2
 from cv2 import cv
-import numpy as np
 from threading import Semaphore
 from SeaGoatVision.server.core.configuration import Configuration
 from SeaGoatVision.commons import log
@@ -87,9 +86,9 @@ class VideoRecorder:
         if self.process is None:
             self.sem.release()
             return
-        # convert image to rgb in image2
-        image2 = np.asarray(image, dtype="uint8")
-        cv2.cvtColor(image, cv.CV_BGR2RGB, image2)
+        # convert image to rgb in image2, the image is shared with the other
+        # observers of the media and must not be modified
+        image2 = cv2.cvtColor(image, cv.CV_BGR2RGB)
         # convert in PIL image
         img = Image.fromarray(image2, 'RGB')
         # Save it in ffmpeg process
@@ -48,6 +48,10 @@ class ThreadMedia(threading.Thread):
         while self.running:
             try:
                 image = self.media.next()
+                # the device can give a better time of the capture
+                timestamp = self.media.get_capture_timestamp()
+                if timestamp is None:
+                    timestamp = time.time()
                 nb_fps += 1
                 no_reset = 0
             except StopIteration:
@@ -81,11 +85,14 @@ class ThreadMedia(threading.Thread):
 
             start_time = time.time()
             if start_time - first_fps_time > 1:
-                self.publisher(nb_fps)
+                if self.publisher:
+                    # drop is the number of images skipped by late observers
+                    self.publisher({"fps": nb_fps,
+                                    "drop": self.media.get_nb_drop()})
                 self.nb_fps = nb_fps
                 nb_fps = 0
                 first_fps_time = start_time
-            self.media.notify_observer(image)
+            self.media.notify_observer(image, timestamp)
             if not self.running:
                 break
             if sleep_time_per_fps > 0:
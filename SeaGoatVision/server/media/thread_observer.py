@@ -0,0 +1,117 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import collections
+import threading
+from SeaGoatVision.commons import keys
+from SeaGoatVision.commons import log
+
+logger = log.get_logger(__name__)
+
+DEFAULT_QUEUE_SIZE = 2
+
+
+class ThreadObserver(threading.Thread):
+
+    """Deliver the images of a media to one observer.
+    A slow observer doesn't stall the media and the other observers, the
+    policy choose what to do when his queue is full:
+     - block : wait the observer, like a direct call.
+     - drop_oldest : drop the oldest image of the queue.
+     - keep_latest : drop all waiting images, keep only the new one.
+    """
+
+    def __init__(self, observer, buffer_pool, name=None, policy=None,
+                 queue_size=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.observer = observer
+        self.buffer_pool = buffer_pool
+        self.observer_name = name if name else str(observer)
+        lst_policy = [keys.get_key_policy_block(),
+                      keys.get_key_policy_drop_oldest(),
+                      keys.get_key_policy_keep_latest()]
+        if policy is None:
+            policy = keys.get_key_policy_block()
+        elif policy not in lst_policy:
+            log.print_function(
+                logger.error, "Unknown policy %s, use %s. Policies: %s" %
+                (policy, keys.get_key_policy_block(), lst_policy))
+            policy = keys.get_key_policy_block()
+        self.policy = policy
+        self.queue_size = queue_size if queue_size else DEFAULT_QUEUE_SIZE
+        self.queue = collections.deque()
+        self.condition = threading.Condition()
+        self.running = True
+        self.nb_drop = 0
+
+    def get_observer_name(self):
+        return self.observer_name
+
+    def get_nb_drop(self):
+        return self.nb_drop
+
+    def put(self, frame, image):
+        # the image is the buffer of the frame, released after the delivery
+        with self.condition:
+            if len(self.queue) >= self.queue_size:
+                if self.policy == keys.get_key_policy_block():
+                    while self.running and len(self.queue) >= self.queue_size:
+                        self.condition.wait()
+                elif self.policy == keys.get_key_policy_keep_latest():
+                    self._drop(len(self.queue))
+                else:
+                    self._drop(1)
+            if not self.running:
+                self.buffer_pool.release(image)
+                return
+            self.queue.append((frame, image))
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                frame, image = self.queue.popleft()
+                self.condition.notify_all()
+            try:
+                self.observer(frame)
+            except Exception as e:
+                msg = "(Observer %s) %s" % (self.observer_name, e)
+                log.printerror_stacktrace(logger, msg, check_duplicate=True)
+            finally:
+                self.buffer_pool.release(image)
+
+        with self.condition:
+            while self.queue:
+                _, image = self.queue.popleft()
+                self.buffer_pool.release(image)
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def _drop(self, nb_image):
+        for _ in range(nb_image):
+            _, image = self.queue.popleft()
+            self.buffer_pool.release(image)
+        self.nb_drop += nb_image
@@ -17,93 +17,420 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+import errno
+import select
 import time
 
 import socket
+import threading
 from threading import Thread
+from SeaGoatVision.commons import record
 from SeaGoatVision.commons import log
 
 logger = log.get_logger(__name__)
 
 BUFFER_SIZE = 1024  # Normally 1024, but we want fast response
+LISTEN_BACKLOG = 128
+# the loop wakes up at least once per delay to check the stop
+LOOP_TIMEOUT = 1.0
+# the messages of a frame are sent at the end of the frame, or after this
+# delay when the filterchain doesn't tell the end
+FLUSH_DELAY = 0.1
+# limit of the data waiting for a slow client, the oldest frames are dropped
+MAX_PENDING_BYTES = 1024 * 1024
+MAX_PENDING_BATCH = 100
+
+# a client sends this line to receive the packets of records, see record
+CMD_BINARY = "binary"
+MODE_TEXT = "text"
+MODE_BINARY = "binary"
+
+POLL_READ = select.POLLIN | select.POLLPRI
+POLL_WRITE = select.POLLOUT
+POLL_ERROR = select.POLLERR | select.POLLHUP | select.POLLNVAL
 
 
 class Server:
 
+    """Send the outputs of the filterchains to the tcp clients.
+    One thread runs a poll loop accepting the clients, detecting their
+    disconnection and writing the outputs, the number of threads doesn't
+    change with the number of clients.
+    The messages are queued, a slow client doesn't stall the filterchains.
+    The messages of the same frame are joined in one write: lines of text
+    by default, or one packet of records when the client sent the line
+    "binary". The frame is written when the filterchain ends it, see
+    OutputObserver.
+    """
+
     def __init__(self):
         self.handlers = []
+        self.lock = threading.Lock()
+        # {Batch.key : Batch} of the frames in execution, not yet queued to
+        # the clients, the oldest first
+        self.dct_batch = collections.OrderedDict()
+        # wake up the loop when a message is queued
+        self.wake_in, self.wake_out = socket.socketpair()
+        self.wake_in.setblocking(False)
+        self.wake_out.setblocking(False)
+        self.socket = None
+        self.done = False
+        self.thread = None
 
     def start(self, ip, port):
-        t = Thread(target=self.inner_start, args=(ip, port,))
-        t.start()
+        self.done = False
+        self.thread = Thread(target=self.inner_start, args=(ip, port,))
+        self.thread.daemon = True
+        self.thread.start()
 
     def inner_start(self, ip, port):
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         # reuse the socket if already open - fix when closed without close.
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.socket.bind((ip, port))
+        self.socket.listen(LISTEN_BACKLOG)
+        self.socket.setblocking(False)
         logger.info("Server awaiting connections on port %s", str(port))
+        try:
+            self._run_loop()
+        finally:
+            self.socket.close()
+            with self.lock:
+                lst_handler = self.handlers
+                self.handlers = []
+            for handler in lst_handler:
+                handler.stop()
 
-        self.done = False
+    def stop(self):
+        self.done = True
+        self._wake_up()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(LOOP_TIMEOUT)
+
+    def get_nb_client(self):
+        return len(self.handlers)
+
+    def create_output_observer(self, cb_delivery=None, scale=1.0):
+        return OutputObserver(self, cb_delivery, scale)
+
+    def send(self, data, frame_info=None, cb_delivery=None, scale=1.0):
+        # data is a string or a record.Record. cb_delivery receives the
+        # frame_info and the time when the data is sent to the clients.
+        # scale is the scale of the execution, sent with the records.
+        # The messages of a frame wait end_frame.
+        with self.lock:
+            if not self.handlers:
+                return
+            if frame_info is None:
+                # nothing to join it with
+                batch = Batch(frame_info, cb_delivery, scale)
+                batch.append(data)
+                self._queue_batch(batch)
+            else:
+                key = Batch.get_key(frame_info, cb_delivery)
+                batch = self.dct_batch.get(key, None)
+                if batch is not None:
+                    batch.append(data)
+                    return
+                batch = self.dct_batch[key] = Batch(frame_info, cb_delivery,
+                                                    scale)
+                batch.append(data)
+        # the loop waits the first batch or the new one
+        self._wake_up()
 
+    def end_frame(self, frame_info, cb_delivery=None):
+        # all the messages of the frame are sent, write them
+        if frame_info is None:
+            return
+        with self.lock:
+            batch = self.dct_batch.pop(
+                Batch.get_key(frame_info, cb_delivery), None)
+            if batch is None:
+                return
+            self._queue_batch(batch)
+        self._wake_up()
+
+    def _queue_batch(self, batch):
+        # call it with the lock
+        batch.close(len(self.handlers))
+        for handler in self.handlers:
+            handler.put(batch)
+
+    def _wake_up(self):
+        try:
+            self.wake_out.send("x")
+        except socket.error:
+            pass  # already awake, the buffer is full
+
+    def _run_loop(self):
+        poller = select.poll()
+        poller.register(self.socket, POLL_READ)
+        poller.register(self.wake_in, POLL_READ)
+        # {fd : ClientHandler}
+        dct_handler = {}
         while not self.done:
-            self.socket.listen(1)
-            self.socket.settimeout(2)
+            timeout = self._flush_late_batch()
+            # listen the writing only when there is something to write
+            for fd, handler in dct_handler.items():
+                events = POLL_READ
+                if handler.has_output():
+                    events |= POLL_WRITE
+                if events != handler.events:
+                    handler.events = events
+                    poller.modify(fd, events)
+            try:
+                lst_event = poller.poll(timeout * 1000)
+            except select.error as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            for fd, event in lst_event:
+                if fd == self.socket.fileno():
+                    self._accept(poller, dct_handler)
+                    continue
+                if fd == self.wake_in.fileno():
+                    self._clear_wake_up()
+                    continue
+                handler = dct_handler.get(fd, None)
+                if handler is None:
+                    continue
+                try:
+                    is_connected = not event & POLL_ERROR
+                    if is_connected and event & POLL_READ:
+                        is_connected = handler.read()
+                    if is_connected and event & POLL_WRITE:
+                        handler.write()
+                except socket.error as e:
+                    logger.warning("Client %s: %s", handler.info, e)
+                    is_connected = False
+                if not is_connected:
+                    poller.unregister(fd)
+                    del dct_handler[fd]
+                    self._remove_handler(handler)
+
+    def _flush_late_batch(self):
+        # queue the frames without end after FLUSH_DELAY, return the delay
+        # until the next one
+        now = time.time()
+        with self.lock:
+            while self.dct_batch:
+                key, batch = next(self.dct_batch.iteritems())
+                delay = batch.start_time + FLUSH_DELAY - now
+                if delay > 0:
+                    return min(delay, LOOP_TIMEOUT)
+                del self.dct_batch[key]
+                self._queue_batch(batch)
+        return LOOP_TIMEOUT
+
+    def _accept(self, poller, dct_handler):
+        # accept all waiting clients
+        while True:
             try:
                 conn, addr = self.socket.accept()
-                logger.info('Connected to: %s', addr)
-                handler = ClientHandler(conn)
+            except socket.error as e:
+                if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK,
+                                     errno.EINTR):
+                    logger.warning("Accept client: %s", e)
+                return
+            logger.info('Connected to: %s', addr)
+            handler = ClientHandler(conn)
+            fd = handler.fileno()
+            dct_handler[fd] = handler
+            poller.register(fd, handler.events)
+            with self.lock:
                 self.handlers.append(handler)
-                t = Thread(target=handler.handle)
-                t.start()
-            except:
-                pass  # Do nothing if no user is added
 
-    def stop(self):
-        self.done = True
-        self.socket.close()
-        for handler in self.handlers:
-            handler.stop()
+    def _clear_wake_up(self):
+        try:
+            while self.wake_in.recv(BUFFER_SIZE):
+                pass
+        except socket.error:
+            pass  # all read
 
-    def send(self, data):
-        for handler in self.handlers:
-            try:
-                handler.send("%s\n" % data)
-            except:
-                handler.stop()
-                if handler in self.handlers:
-                    self.handlers.remove(handler)
-                logger.warning("Client disconnected %s", handler.info)
+    def _remove_handler(self, handler):
+        with self.lock:
+            if handler in self.handlers:
+                self.handlers.remove(handler)
+        handler.stop()
+
+
+class Batch(object):
+
+    """Messages of one frame of an execution, written in one time to the
+    clients. The delivery is reported when all clients received it or
+    dropped it.
+    """
+
+    def __init__(self, frame_info, cb_delivery, scale=1.0):
+        self.frame_info = frame_info
+        self.cb_delivery = cb_delivery
+        self.scale = scale
+        self.start_time = time.time()
+        self.lst_message = []
+        # {mode : data sent to the clients}
+        self.dct_data = {}
+        self.nb_pending = 0
+        self.is_delivered = False
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_key(frame_info, cb_delivery):
+        # the frame can be deserialized in many FrameInfo, like with a
+        # worker process. The bound methods are equal, not identical.
+        return cb_delivery, frame_info.media_name, frame_info.seq
+
+    def append(self, message):
+        self.lst_message.append(message)
+
+    def close(self, nb_client):
+        self.nb_pending = nb_client
+
+    def get_data(self, mode):
+        # encoded one time for all the clients of the mode
+        data = self.dct_data.get(mode, None)
+        if data is not None:
+            return data
+        if mode == MODE_BINARY:
+            frame = None
+            if self.frame_info is not None:
+                frame = self.frame_info.serialize()
+                frame["scale"] = self.scale
+            data = record.encode_stream(record.encode(self.lst_message, frame))
+        else:
+            data = "".join(["%s\n" % message for message in self.lst_message])
+        self.dct_data[mode] = data
+        return data
+
+    def done(self, is_delivered):
+        # called for each client, when it's sent or dropped
+        with self.lock:
+            self.nb_pending -= 1
+            self.is_delivered |= is_delivered
+            if self.nb_pending > 0 or not self.is_delivered:
+                return
+        if self.cb_delivery and self.frame_info is not None:
+            self.cb_delivery(self.frame_info, time.time())
+
+
+class OutputObserver(object):
+
+    """Output observer of a filterchain, sending to the clients of the
+    server. The filterchain calls end_frame after the execution of a frame,
+    his messages are written in one time.
+    """
+
+    def __init__(self, server, cb_delivery=None, scale=1.0):
+        self.server = server
+        self.cb_delivery = cb_delivery
+        self.scale = scale
+
+    def __call__(self, data, frame_info=None):
+        self.server.send(data, frame_info, self.cb_delivery, self.scale)
+
+    def end_frame(self, frame_info):
+        self.server.end_frame(frame_info, self.cb_delivery)
 
 
 class ClientHandler:
 
+    """Connection of a client, used only by the loop of the Server, except
+    put.
+    """
+
     def __init__(self, conn):
-        self.done = False
         self.conn = conn
-        self.info = conn.getsockname()
+        self.conn.setblocking(False)
+        self.info = conn.getpeername()
+        # events listened by the poll of the Server
+        self.events = POLL_READ
+        self.lock = threading.Lock()
+        self.mode = MODE_TEXT
+        # (batch, data)
+        self.queue = collections.deque()
+        self.nb_pending_bytes = 0
+        # bytes of the first batch already sent
+        self.offset = 0
+        # the first batch is sent by the loop, put must not drop it
+        self.sending = False
+        self.nb_drop = 0
 
-    def handle(self):
-        while not self.done:
-            try:
-                _ = self.conn.recv(BUFFER_SIZE)
-            except:
-                time.sleep(1)
-                pass  # Do noting if no data is received
+    def fileno(self):
+        return self.conn.fileno()
 
-            # if not data: break
-            # print "received data:", data
-            # self.conn.send(data)  # echo
-            # self.conn.close()
+    def read(self):
+        # the clients send only the mode, the read detects the
+        # disconnection. Return False when disconnected.
+        try:
+            data = self.conn.recv(BUFFER_SIZE)
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return True
+            raise
+        if CMD_BINARY in data.split():
+            # the next frames, the queued ones keep their mode
+            self.mode = MODE_BINARY
+        return bool(data)
 
     def stop(self):
-        self.done = True
         try:
             self.conn.shutdown(socket.SHUT_RDWR)
-        except:
+        except socket.error:
             pass
         logger.info("Disconnect client %s", str(self.info))
         self.conn.close()
+        with self.lock:
+            lst_batch = [batch for batch, _ in self.queue]
+            self.queue.clear()
+        for batch in lst_batch:
+            batch.done(False)
 
-    def send(self, data):
-        self.conn.send(data)
+    def put(self, batch):
+        data = batch.get_data(self.mode)
+        with self.lock:
+            self.queue.append((batch, data))
+            self.nb_pending_bytes += len(data)
+            # drop the oldest frames, except the one being sent
+            index = 1 if self.offset or self.sending else 0
+            while len(self.queue) > index + 1 and \
+                    (len(self.queue) > MAX_PENDING_BATCH or
+                     self.nb_pending_bytes > MAX_PENDING_BYTES):
+                dropped, data = self.queue[index]
+                del self.queue[index]
+                self.nb_pending_bytes -= len(data)
+                dropped.done(False)
+                self.nb_drop += 1
+                if self.nb_drop == 1 or not self.nb_drop % 100:
+                    logger.warning("Client %s is late, %d outputs dropped.",
+                                   self.info, self.nb_drop)
+
+    def has_output(self):
+        return bool(self.queue)
+
+    def write(self):
+        # send what the socket accepts, the rest waits the next poll
+        while True:
+            with self.lock:
+                if not self.queue:
+                    return
+                batch, data = self.queue[0]
+                offset = self.offset
+                self.sending = True
+            try:
+                nb_sent = self.conn.send(data[offset:])
+            except socket.error as e:
+                with self.lock:
+                    self.sending = False
+                if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK,
+                                 errno.EINTR):
+                    return
+                raise
+            with self.lock:
+                self.sending = False
+                self.offset += nb_sent
+                self.nb_pending_bytes -= nb_sent
+                if self.offset < len(data):
+                    return
+                self.offset = 0
+                self.queue.popleft()
+            batch.done(True)
@@ -0,0 +1,79 @@
+#! /usr/bin/env python2.7
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Description : Benchmark a filterchain offline
+"""
+import argparse
+
+import sys
+argument = sys.argv[1:]
+from SeaGoatVision.server.benchmark import run
+
+
+def resolution(value):
+    try:
+        width, height = value.lower().split("x")
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "Resolution %s is not like 640x480." % value)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Filterchain benchmark')
+    parser.add_argument(
+        'filterchain', type=str,
+        help='name of the filterchain in configurations/*/filterchain')
+    parser.add_argument(
+        "-r",
+        '--resolution',
+        type=resolution,
+        action="append",
+        help='resolution of the frames, like 640x480. Can be repeated.')
+    parser.add_argument(
+        '--folder',
+        type=str,
+        help='execute the images of this folder or this image')
+    parser.add_argument(
+        '--movie',
+        type=str,
+        help='execute the frames of this movie')
+    parser.add_argument(
+        "-n",
+        '--nb_frame',
+        type=int,
+        default=300,
+        help='number of frames to execute')
+    parser.add_argument(
+        '--warmup',
+        type=int,
+        default=10,
+        help='number of frames executed before the measure')
+    parser.add_argument(
+        "-o",
+        '--output',
+        type=str,
+        default="benchmark.json",
+        help='json file of the result')
+    args = parser.parse_args(args=argument)
+    lst_resolution = args.resolution if args.resolution else [(640, 480)]
+    data = run(args.filterchain, lst_resolution, folder=args.folder,
+               movie=args.movie, nb_frame=args.nb_frame,
+               nb_warmup=args.warmup, output=args.output)
+    if data is None:
+        sys.exit(1)
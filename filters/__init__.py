@@ -20,7 +20,22 @@
 from SeaGoatVision.server.core.configuration import Configuration
 config = Configuration()
 
-if config.get_is_show_public_filter():
-    from public import *
-if config.get_is_show_private_filter():
-    from private import *
+# The server import only the filters used, from the index of the Resource.
+# import_all() import every filters in this namespace.
+
+
+def import_all():
+    if config.get_is_show_public_filter():
+        import public
+        public.import_all()
+        _add_names(public)
+    if config.get_is_show_private_filter():
+        import private
+        private.import_all()
+        _add_names(private)
+
+
+def _add_names(module):
+    # like "from module import *"
+    globals().update({name: value for name, value in vars(module).items()
+                      if not name.startswith("_")})
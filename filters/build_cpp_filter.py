@@ -28,3 +28,4 @@ os.sys.path.append(parent_dir)
 
 # Import filter to call compiler
 import filters
+filters.import_all()
@@ -18,38 +18,39 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import sys
-import time
-# from SeaGoatVision.server.core.utils import add_filter_module
-from SeaGoatVision.server.cpp.create_module import *
 
 # Global variable for cpp filter
 # TODO find another solution to remove global variable, like log file
 if 'cppfiles' not in globals():
     global cppfiles
     cppfiles = {}
-if 'cpptimestamps' not in globals():
-    global cpptimestamps
-    cpptimestamps = {}
-
-# Import all directory recursively
-act_dir = os.path.dirname(__file__)
-for f in os.listdir(act_dir):
-    if not os.path.isdir(act_dir + "/" + f):
-        continue
-    filename, _ = os.path.splitext(f)
-    code = 'from %(module)s import *' % {'module': filename}
-    exec(code)
-
-
-# add_filter_module(sys.modules[__name__], __file__)
-
-# PYTHON FILTERS IMPORT
-for f in os.listdir(os.path.dirname(__file__)):
-    if not f.endswith(".py") or f == "__init__.py":
-        continue
-    filename, _ = os.path.splitext(f)
-    code = 'from %(module)s import *' % {'module': filename}
-    exec(code)
-
-# C++ FILTERS IMPORT
-import_all_cpp_filter(cppfiles, cpptimestamps, sys.modules[__name__], __file__)
+
+# The filters are imported on demand, import_all() import all of them
+
+
+def import_all():
+    # Import all directory recursively
+    act_dir = os.path.dirname(__file__)
+    for f in os.listdir(act_dir):
+        if not os.path.isdir(act_dir + "/" + f):
+            continue
+        filename, _ = os.path.splitext(f)
+        code = 'from %(module)s import *' % {'module': filename}
+        exec(code, globals())
+
+    # PYTHON FILTERS IMPORT
+    for f in os.listdir(os.path.dirname(__file__)):
+        if not f.endswith(".py") or f == "__init__.py":
+            continue
+        filename, _ = os.path.splitext(f)
+        code = 'from %(module)s import *' % {'module': filename}
+        exec(code, globals())
+
+    import_cpp_filter()
+
+
+def import_cpp_filter():
+    # C++ FILTERS IMPORT
+    from SeaGoatVision.server.cpp.create_module import import_all_cpp_filter
+    import_all_cpp_filter(
+        cppfiles, sys.modules[__name__], __file__)
@@ -6,6 +6,8 @@ from SeaGoatVision.server.core.filter import Filter
 
 class BGR2HSVManual(Filter):
 
+    modify_input = False
+
     def __init__(self):
         Filter.__init__(self)
 
@@ -19,6 +19,7 @@
 
 import cv2
 from cv2 import cv
+from SeaGoatVision.server.core import color_space
 from SeaGoatVision.server.core.filter import Filter
 
 
@@ -29,6 +30,11 @@ class BGR2RGB(Filter):
     def __init__(self):
         Filter.__init__(self)
 
+    def get_color_conversion(self, from_space):
+        # the same swap of the channels
+        return {color_space.BGR: color_space.RGB,
+                color_space.RGB: color_space.BGR}.get(from_space, None)
+
     def execute(self, image):
         cv2.cvtColor(image, cv.CV_BGR2RGB, image)
         return image
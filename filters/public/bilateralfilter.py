@@ -27,6 +27,8 @@ class BilateralFilter(Filter):
 
     """Applies the bilateral filter to an image."""
 
+    modify_input = False
+
     def __init__(self):
         Filter.__init__(self)
         self.diameter = Param("Diameter", 10, min_v=0, max_v=255)
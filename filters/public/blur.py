@@ -26,6 +26,8 @@ class Blur(Filter):
 
     """Smoothes an image using the normalized box filter"""
 
+    roi_support = True
+
     def __init__(self):
         Filter.__init__(self)
         self.kernel_width = Param("width", 3, min_v=1, max_v=10)
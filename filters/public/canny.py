@@ -28,6 +28,8 @@ class Canny(Filter):
 
     """Apply a canny filter to the image"""
 
+    roi_support = True
+
     def __init__(self):
         Filter.__init__(self)
         self.threshold1 = Param("Threshold1", 10, min_v=0, max_v=255)
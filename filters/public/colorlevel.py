@@ -17,6 +17,8 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import cv2
+import numpy as np
 from SeaGoatVision.commons.param import Param
 from SeaGoatVision.server.core.filter import Filter
 
@@ -29,17 +31,28 @@ class ColorLevel(Filter):
         100% = Original
         Example: With 50% Blue and the following pixel (100, 100, 100) give (50, 100, 100)"""
 
+    modify_input = False
+    roi_support = True
+
     def __init__(self):
         Filter.__init__(self)
         self.red = Param("red", 100, min_v=0, max_v=255)
         self.green = Param("green", 100, min_v=0, max_v=255)
         self.blue = Param("blue", 100, min_v=0, max_v=255)
+        # (version of the params, table)
+        self._lut = (None, None)
+
+    def get_lut(self):
+        # one table by channel BGR, built again when a param changes
+        version = self.get_params_version()
+        if self._lut[0] == version:
+            return self._lut[1]
+        values = np.arange(256, dtype=np.float32)[:, np.newaxis]
+        levels = np.array([self.blue.get(), self.green.get(), self.red.get()],
+                          dtype=np.float32) / 100
+        lut = np.clip(values * levels, 0, 255).astype(np.uint8)
+        self._lut = (version, lut)
+        return lut
 
     def execute(self, image):
-        if self.red != 100:
-            image[:, :, 2] *= self.red.get() / 100
-        if self.green != 100:
-            image[:, :, 1] *= self.green.get() / 100
-        if self.blue != 100:
-            image[:, :, 0] *= self.blue.get() / 100
-        return image
+        return cv2.LUT(image, self.get_lut().reshape((256, 1, 3)))
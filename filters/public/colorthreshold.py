@@ -17,6 +17,7 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import cv2
 import numpy as np
 from SeaGoatVision.commons.param import Param
 from SeaGoatVision.server.core.filter import Filter
@@ -29,30 +30,38 @@ class ColorThreshold(Filter):
         Everything within this threshold is white (255, 255, 255)
         Everything else is black (0, 0, 0)"""
 
+    modify_input = False
+    roi_support = True
+
     def __init__(self):
         Filter.__init__(self)
         self.blue = Param("Blue", 20, min_v=1, max_v=256, thres_h=256)
         self.green = Param("Green", 20, min_v=1, max_v=256, thres_h=256)
         self.red = Param("Red", 20, min_v=1, max_v=256, thres_h=256)
-        self._barray = None
-        self._garray = None
-        self._rarray = None
-        self.configure()
-
-    def configure(self):
-        min_v, max_v = self.blue.get()
-        self._barray = np.array([1.0 * (min_v <= x <= max_v)
-                                 for x in range(0, 256)], dtype=np.float32)
-        min_v, max_v = self.green.get()
-        self._garray = np.array([1.0 * (min_v <= x <= max_v)
-                                 for x in range(0, 256)], dtype=np.float32)
-        min_v, max_v = self.red.get()
-        self._rarray = np.array([1.0 * (min_v <= x <= max_v)
-                                 for x in range(0, 256)], dtype=np.float32)
+        # (version of the params, table)
+        self._lut = (None, None)
+
+    def get_lut(self):
+        # 255 when the value is in the threshold of his channel BGR, built
+        # again when a param changes
+        version = self.get_params_version()
+        if self._lut[0] == version:
+            return self._lut[1]
+        values = np.arange(256)
+        lst_column = []
+        for param in (self.blue, self.green, self.red):
+            min_v, max_v = param.get()
+            lst_column.append((min_v <= values) & (values <= max_v))
+        lut = np.array(lst_column, dtype=np.uint8).T * 255
+        self._lut = (version, lut)
+        return lut
+
+    def execute_lut(self, image):
+        # white when the three channels are in their threshold
+        b, g, r = cv2.split(image)
+        mask = cv2.min(cv2.min(b, g), r)
+        return cv2.merge((mask, mask, mask))
 
     def execute(self, image):
-        image[:, :, 0] = image[:, :, 1] = image[:, :, 2] = (
-            255 * self._barray[image[:, :, 0]] *
-            self._garray[image[:, :, 1]] *
-            self._rarray[image[:, :, 2]])
-        return image
+        return self.execute_lut(
+            cv2.LUT(image, self.get_lut().reshape((256, 1, 3))))
@@ -4,6 +4,7 @@
 import cv2
 from cv2 import cv
 import os
+from SeaGoatVision.server.core import color_space
 from SeaGoatVision.server.core.filter import Filter
 from SeaGoatVision.commons.param import Param
 
@@ -12,6 +13,9 @@ class FaceDetection(Filter):
 
     """Detect faces and eyes"""
 
+    # the cascade works on the gray of a BGR image
+    input_color_space = color_space.BGR
+
     def __init__(self):
         Filter.__init__(self)
         self.nb_face = 1
@@ -71,7 +75,8 @@ class FaceDetection(Filter):
         c_x = (maxx - minx) / 2 + minx
         c_y = (maxy - miny) / 2 + miny
         if self.notify_filter.get():
-            self.notify_output_observers("facedetect%d : x=%d, y=%d" %
-                                        (self.nb_face, c_x, c_y))
+            # the output is sent in the coordinates of the media
+            self.output_point("facedetect%d" % self.nb_face, c_x, c_y,
+                              text_format="%(name)s : x=%(x)d, y=%(y)d")
         self.nb_face += 1
         return image[miny:maxy, minx:maxx]
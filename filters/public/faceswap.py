@@ -7,6 +7,7 @@ import numpy as np
 
 import os
 import sys
+from SeaGoatVision.server.core import color_space
 from SeaGoatVision.server.core.filter import Filter
 
 
@@ -14,6 +15,9 @@ class FaceSwap(Filter):
 
     """Swap faces"""
 
+    # the cascade works on the gray of a BGR image
+    input_color_space = color_space.BGR
+
     def __init__(self):
         Filter.__init__(self)
         self.face_detect_name = os.path.join('data',
@@ -26,6 +26,8 @@ class GaussianBlur(Filter):
 
     """Smoothes an image using a Gaussian filter"""
 
+    roi_support = True
+
     def __init__(self):
         Filter.__init__(self)
         self.kernel_height = Param("Kernel Height", 3, min_v=1, max_v=256)
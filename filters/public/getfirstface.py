@@ -6,6 +6,7 @@ from cv2 import cv
 import numpy as np
 
 import os
+from SeaGoatVision.server.core import color_space
 from SeaGoatVision.server.core.filter import Filter
 
 
@@ -13,6 +14,9 @@ class GetFirstFace(Filter):
 
     """Get first face detected in the image"""
 
+    # the cascade works on the gray of a BGR image
+    input_color_space = color_space.BGR
+
     def __init__(self):
         Filter.__init__(self)
         self.face_detect_name = os.path.join('data',
@@ -57,9 +57,12 @@ class LineOrientation(Filter):
             vx, vy, x, y = l
             point1 = (x - t * vx, y - t * vy)
             point2 = (x + t * vx, y + t * vy)
-            to_send = "LineOrientation: x1=" + str(int(point1[0][0])) + " y1=" + str(
-                int(point1[1][0])) + " x2=" + str(int(point2[0][0])) + " y2=" + str(int(point2[1][0])) + " \n"
-            self.notify_output_observers(to_send)
+            # the output is sent in the coordinates of the media
+            self.output_line("LineOrientation", float(point1[0][0]),
+                             float(point1[1][0]), float(point2[0][0]),
+                             float(point2[1][0]),
+                             text_format="%(name)s: x1=%(x1)d y1=%(y1)d "
+                                         "x2=%(x2)d y2=%(y2)d \n")
             cv2.line(image, point1, point2, (0, 0, 255), 3, -1)
             cv2.circle(image, (x, y), 5, (0, 255, 0), -1)
 
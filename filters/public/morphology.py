@@ -25,6 +25,8 @@ from SeaGoatVision.server.core.filter import Filter
 
 class Morphology(Filter):
 
+    roi_support = True
+
     def __init__(self):
         Filter.__init__(self)
         self.kernel_width = Param("Kernel Width", 3, min_v=1, max_v=256)
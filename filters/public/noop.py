@@ -23,6 +23,8 @@ class Noop(Filter):
 
     """Do nothing"""
 
+    modify_input = False
+
     def __init__(self):
         Filter.__init__(self)
 
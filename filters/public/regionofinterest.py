@@ -0,0 +1,46 @@
+#! /usr/bin/env python
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from SeaGoatVision.commons.param import Param
+from SeaGoatVision.server.core.filter import Filter
+
+
+class RegionOfInterest(Filter):
+
+    """Limit the next filters to a region of the image, in % of the image.
+        The filters supporting the region of interest don't touch the pixels
+        outside, the others work on all the image."""
+
+    modify_input = False
+
+    def __init__(self):
+        Filter.__init__(self)
+        self.left = Param("Left %", 0, min_v=0, max_v=100)
+        self.top = Param("Top %", 0, min_v=0, max_v=100)
+        self.width = Param("Width %", 100, min_v=1, max_v=100)
+        self.height = Param("Height %", 100, min_v=1, max_v=100)
+
+    def execute(self, image):
+        rows, cols = image.shape[:2]
+        x = cols * self.left.get() / 100
+        y = rows * self.top.get() / 100
+        width = cols * self.width.get() / 100
+        height = rows * self.height.get() / 100
+        self.set_roi((x, y, width, height))
+        return image
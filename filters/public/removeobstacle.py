@@ -10,6 +10,8 @@ class RemoveObstacle(Filter):
 
     """Remove obstacles from an image"""
 
+    roi_support = True
+
     def __init__(self):
         Filter.__init__(self)
         self.threshold = Param("Threshold", 12, min_v=0, max_v=255)
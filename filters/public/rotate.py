@@ -27,6 +27,8 @@ class Rotate(Filter):
 
     """Draw a black rectangle on top of the image"""
 
+    modify_input = False
+
     def __init__(self):
         Filter.__init__(self)
         self.enable = Param('enable', True)
@@ -28,6 +28,9 @@ class SectionFilter(Filter):
 
     """"""
 
+    modify_input = False
+    roi_support = True
+
     def __init__(self):
         Filter.__init__(self)
         self.kernel_erode_height = Param(
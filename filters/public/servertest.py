@@ -6,6 +6,8 @@ class ServerTest(Filter):
 
     """Send a example line"""
 
+    modify_input = False
+
     def __init__(self):
         Filter.__init__(self)
 
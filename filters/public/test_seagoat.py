@@ -27,6 +27,8 @@ from SeaGoatVision.server.core.filter import Filter
 
 class TestSeagoat(Filter):
 
+    modify_input = False
+
     def __init__(self):
         Filter.__init__(self)
         self.param_str = Param("param_str", "")
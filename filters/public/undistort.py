@@ -27,6 +27,8 @@ class Undistort(Filter):
 
     """Do nothing"""
 
+    modify_input = False
+
     def __init__(self):
         Filter.__init__(self)
 
@@ -9,6 +9,8 @@ from SeaGoatVision.server.core.filter import Filter
 # you have access to :
 # self.get_params(param_name=None) to get a list or object of Params
 # self.notify_output_observers(string) to send a notification to observer
+# self.output_point(name, x, y), output_line, output_rect, output_scalar and
+# output_array to send a typed output, the clients don't parse it
 
 # Reserved function
 # self.add_output_observer(observer) to add a function observer
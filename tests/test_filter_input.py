@@ -0,0 +1,72 @@
+#! /usr/bin/env python2.7
+
+#    Copyright (C) 2012  Octets - octets.etsmtl.ca
+#
+#    This file is part of SeaGoatVision.
+#
+#    SeaGoatVision is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Description : The public filters with modify_input = False leave their input
+frame untouched
+"""
+import importlib
+import inspect
+import os
+import unittest
+
+import numpy as np
+
+import filters.public
+from SeaGoatVision.server.core.filter import Filter
+
+
+def get_read_only_filters():
+    lst_filter = []
+    path = os.path.dirname(filters.public.__file__)
+    for f in sorted(os.listdir(path)):
+        if not f.endswith(".py") or f == "__init__.py":
+            continue
+        name = "filters.public.%s" % os.path.splitext(f)[0]
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            # optional dependency of the filter, like scipy or PIL
+            continue
+        for _, clazz in inspect.getmembers(module, inspect.isclass):
+            if issubclass(clazz, Filter) and clazz is not Filter and \
+                    clazz.__module__ == name and not clazz.modify_input:
+                lst_filter.append(clazz)
+    return lst_filter
+
+
+class TestFilterInput(unittest.TestCase):
+
+    def test_input_untouched(self):
+        lst_filter = get_read_only_filters()
+        self.assertTrue(lst_filter)
+        np.random.seed(0)
+        for clazz in lst_filter:
+            image = np.random.randint(0, 256, (480, 640, 3)).astype(np.uint8)
+            expected = image.copy()
+            # like the frame of a media, see Media._get_shared_frame
+            image.flags.writeable = False
+            o_filter = clazz()
+            o_filter.configure()
+            o_filter.execute(image)
+            self.assertTrue(np.array_equal(image, expected),
+                            "%s modified its input" % clazz.__name__)
+
+
+if __name__ == "__main__":
+    unittest.main()